@@ -0,0 +1,671 @@
+"""Offline performance benchmarks for the AutoPrayer render pipeline.
+
+Every input is synthetic and the Claude/ElevenLabs calls are stubbed, so runs are
+reproducible and need no API keys or background videos.
+
+Usage:
+    python benchmark.py [scaling] [compositing] [backends] [frames] [pipeline] [profiles] [segments] [memory]
+                        [audio] [voiceover] [startup] [--frames 30] [--duration 10] [--backgrounds 1080p 4k] [--durations 5 15]
+                        [--profile standard] [--segments 2 4] [--lengths 5 10 20] [--memory-mb 1024]
+                        [--max-growth-mb 64]
+                        [--preset medium] [--output results.json]
+"""
+import argparse
+import contextlib
+import http.server
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from moviepy.editor import AudioFileClip, CompositeVideoClip, ImageClip, VideoFileClip
+
+import generate_video
+from generate_video import (AUDIO_BITRATE_KBPS, BatchPipeline, Colors, ContentCache, ENCODE_PROFILES, FrameScaler, SCALING_MODES,
+                            StaticOverlayCompositor, TEXT_OVERLAYS, VoiceoverClient, X264_PRESETS, create_final_video,
+                            create_text_overlays, get_moviepy_setting, make_temp_audio_path, metrics, prepare_audio,
+                            resize_frame, safe_close)
+
+RESOLUTIONS = {
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+}
+
+# Synthetic background clips for the frames and pipeline benchmarks, covering the usual aspect ratios
+BACKGROUNDS = {
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+    'ultrawide': (2560, 1080),
+    'square': (1080, 1080),
+    'portrait': (1080, 1920),
+}
+
+STUB_SCRIPT = (
+    "Oración de Prueba",
+    "Una descripción de prueba",
+    "Señor, te pido que guíes mis pasos y me des paz en este día. Amén.",
+)
+
+def synthetic_frame(width, height, seed=0):
+    """Create a noisy gradient frame, so resampling can't take shortcuts on flat areas."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                     np.full((height, width), 128, np.float32)], axis=-1)
+    noise = rng.normal(0, 20, size=(height, width, 3)).astype(np.float32)
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+def measure_fps(func, frame, frames):
+    """Run func over the same frame and return the frames per second."""
+    func(frame)  # Warm-up
+    start = time.perf_counter()
+    for _ in range(frames):
+        func(frame)
+    return frames / (time.perf_counter() - start)
+
+def legacy_process_frame(source_size, target_size=(1080, 1920)):
+    """The original full-frame resize followed by a center crop."""
+    target_w, target_h = target_size
+    new_width = int(target_h * source_size[0] / source_size[1])
+    new_width = new_width + (new_width % 2)
+
+    def process_frame(frame):
+        resized = resize_frame(frame, (new_width, target_h))
+        start_x = resized.shape[1] // 2 - target_w // 2
+        return resized[:, start_x:start_x + target_w]
+    return process_frame
+
+def bench_scaling(args):
+    results = []
+    for name, size in RESOLUTIONS.items():
+        frame = synthetic_frame(*size)
+        baseline = measure_fps(legacy_process_frame(size), frame, args.frames)
+        results.append({'benchmark': 'scaling', 'input': name, 'variant': 'legacy-lanczos',
+                        'fps': baseline, 'speedup': 1.0})
+        for mode in SCALING_MODES:
+            fps = measure_fps(FrameScaler(size, mode=mode), frame, args.frames)
+            results.append({'benchmark': 'scaling', 'input': name, 'variant': f'scaler-{mode}',
+                            'fps': fps, 'speedup': fps / baseline})
+    return results
+
+def bench_compositing(args):
+    frame = synthetic_frame(1080, 1920)
+    overlays = create_text_overlays("Oración de Esperanza", "Una oración de fe y esperanza")
+    positions = [('center', style['y']) for style in TEXT_OVERLAYS]
+
+    text_clips = [ImageClip(overlay).set_position(position).set_duration(1)
+                  for overlay, position in zip(overlays, positions)]
+    composite = CompositeVideoClip([ImageClip(frame).set_duration(1)] + text_clips)
+    baseline = measure_fps(lambda f: composite.get_frame(0), frame, args.frames)
+
+    # Decoded frames are read-only, so this includes the copy into the compositor's buffer
+    compositor = StaticOverlayCompositor(list(zip(overlays, positions)))
+    read_only = frame.copy()
+    read_only.flags.writeable = False
+    fps = measure_fps(compositor, read_only, args.frames)
+    return [
+        {'benchmark': 'compositing', 'input': '1080x1920', 'variant': 'CompositeVideoClip',
+         'fps': baseline, 'speedup': 1.0},
+        {'benchmark': 'compositing', 'input': '1080x1920', 'variant': 'static-compositor',
+         'fps': fps, 'speedup': fps / baseline},
+    ]
+
+def ffmpeg(*args):
+    """Run the ffmpeg binary bundled with MoviePy."""
+    command = [get_moviepy_setting("FFMPEG_BINARY"), '-y', '-loglevel', 'error', *args]
+    return subprocess.run(command, check=True, capture_output=True, text=True)
+
+def synthetic_video(path, width, height, duration, fps=30):
+    """Encode a moving test pattern clip."""
+    ffmpeg('-f', 'lavfi', '-i', f'testsrc2=size={width}x{height}:rate={fps}', '-t', str(duration),
+           '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', path)
+    return path
+
+def synthetic_audio(path, duration):
+    """Encode a sine tone standing in for a voiceover."""
+    ffmpeg('-f', 'lavfi', '-i', 'sine=frequency=220:sample_rate=44100', '-t', str(duration),
+           '-c:a', 'libmp3lame', '-b:a', '128k', path)
+    return path
+
+def psnr(reference_path, distorted_path):
+    """Average PSNR between two videos, in dB."""
+    result = subprocess.run(
+        [get_moviepy_setting("FFMPEG_BINARY"), '-i', distorted_path, '-i', reference_path,
+         '-lavfi', 'psnr', '-f', 'null', '-'],
+        capture_output=True, text=True
+    )
+    match = re.search(r'average:(\S+)', result.stderr)
+    return float(match.group(1)) if match and match.group(1) != 'inf' else float('inf')
+
+def bench_backends(args):
+    results = []
+    temp_dir = tempfile.mkdtemp(prefix='autoprayer_bench_')
+    try:
+        # A short background forces the loop path, like most real backgrounds
+        background = synthetic_video(os.path.join(temp_dir, 'background.mp4'), 1920, 1080, args.duration / 2)
+        audio = synthetic_audio(os.path.join(temp_dir, 'voiceover.mp3'), args.duration)
+        frames = int(args.duration * 30)
+        outputs = {}
+        for backend in ('moviepy', 'ffmpeg'):
+            # create_final_video deletes the audio file once it is done
+            audio_copy = shutil.copy(audio, os.path.join(temp_dir, f'voiceover_{backend}.mp3'))
+            outputs[backend] = os.path.join(temp_dir, f'{backend}.mp4')
+            start = time.perf_counter()
+            create_final_video(background, audio_copy, "Oración de Prueba", "Una descripción de prueba",
+                               outputs[backend], backend=backend, encode_profile=args.profile, preset=args.preset)
+            elapsed = time.perf_counter() - start
+            results.append({'benchmark': 'backends', 'input': '1080p', 'variant': backend,
+                            'fps': frames / elapsed, 'seconds': elapsed})
+        baseline = results[0]['fps']
+        for row in results:
+            row['speedup'] = row['fps'] / baseline
+        results[-1]['psnr_vs_moviepy'] = psnr(outputs['moviepy'], outputs['ffmpeg'])
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+def bench_audio(args):
+    """Audio handling of one render: MoviePy's load, trim and AAC re-encode vs prepare_audio, cold and cached."""
+    results = []
+    temp_dir = tempfile.mkdtemp(prefix='autoprayer_bench_')
+    try:
+        # Longer than 59 seconds, so every variant trims
+        audio = synthetic_audio(os.path.join(temp_dir, 'voiceover.mp3'), 62)
+        
+        start = time.perf_counter()
+        clip = AudioFileClip(audio)
+        clip.subclip(0, 59).write_audiofile(os.path.join(temp_dir, 'moviepy.m4a'), 44100, codec='aac',
+                                            bitrate=f'{AUDIO_BITRATE_KBPS}k', logger=None)
+        clip.close()
+        results.append({'benchmark': 'audio', 'input': '62s', 'variant': 'moviepy',
+                        'seconds': time.perf_counter() - start})
+        
+        cache = ContentCache(os.path.join(temp_dir, 'cache'), 100, '.m4a')
+        for variant in ('prepare', 'prepare (cached)'):
+            start = time.perf_counter()
+            prepare_audio(audio, cache)
+            results.append({'benchmark': 'audio', 'input': '62s', 'variant': variant,
+                            'seconds': time.perf_counter() - start})
+        baseline = results[0]['seconds']
+        for row in results:
+            row['fps'] = None
+            row['speedup'] = baseline / row['seconds']
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+def iter_fps(frames_iter, frames):
+    """Consume up to `frames` frames and return the frames per second."""
+    start = time.perf_counter()
+    count = sum(1 for _ in itertools.islice(frames_iter, frames))
+    return count / (time.perf_counter() - start)
+
+def bench_frames(args):
+    """Time decoding, resize_frame, FrameScaler and the full fl_image path for each background."""
+    results = []
+    temp_dir = tempfile.mkdtemp(prefix='autoprayer_bench_')
+    try:
+        for name in args.backgrounds:
+            size = BACKGROUNDS[name]
+            path = synthetic_video(os.path.join(temp_dir, f'{name}.mp4'), *size, args.frames / 30 + 1)
+            clip = VideoFileClip(path)
+            try:
+                frame = clip.get_frame(0)
+                baseline = measure_fps(legacy_process_frame(size), frame, args.frames)
+                scaler_fps = measure_fps(FrameScaler(size), frame, args.frames)
+                decode_fps = iter_fps(clip.iter_frames(), args.frames)
+                fl_image_fps = iter_fps(clip.fl_image(FrameScaler(size)).iter_frames(), args.frames)
+            finally:
+                safe_close(clip)
+            results += [
+                {'benchmark': 'frames', 'input': name, 'variant': 'decode', 'fps': decode_fps, 'speedup': None},
+                {'benchmark': 'frames', 'input': name, 'variant': 'resize_frame', 'fps': baseline,
+                 'speedup': 1.0},
+                {'benchmark': 'frames', 'input': name, 'variant': 'frame-scaler', 'fps': scaler_fps,
+                 'speedup': scaler_fps / baseline},
+                {'benchmark': 'frames', 'input': name, 'variant': 'fl_image', 'fps': fl_image_fps,
+                 'speedup': None},
+            ]
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+@contextlib.contextmanager
+def stubbed_apis(audio_path):
+    """Replace the Claude and ElevenLabs calls with a canned script and a synthetic voiceover."""
+    def fake_script(api_key, verbose=True, cache=None, seed=None, base_url=None):
+        return STUB_SCRIPT
+
+    def fake_voiceover(script, api_key, temp_audio_path=None, cache=None, base_url=None, voice_id=None):
+        return shutil.copy(audio_path, temp_audio_path or make_temp_audio_path())
+
+    originals = generate_video.generate_script_from_claude, generate_video.create_voiceover
+    generate_video.generate_script_from_claude, generate_video.create_voiceover = fake_script, fake_voiceover
+    try:
+        yield
+    finally:
+        generate_video.generate_script_from_claude, generate_video.create_voiceover = originals
+
+@contextlib.contextmanager
+def voiceover_stand_in(responses, body):
+    """Local HTTP server answering text-to-speech requests in turn with each of responses.
+
+    A response is a status code, or 'reset' to send half of body and drop the
+    connection. Yields the server's base URL and the list of requests it received.
+    """
+    received = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            received.append(self.path)
+            response = responses[min(len(received), len(responses)) - 1]
+            self.send_response(200 if response == 'reset' else response)
+            self.send_header('Content-Type', 'audio/mpeg')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body[:len(body) // 2] if response == 'reset' else body)
+            self.close_connection = response == 'reset'
+
+        def log_message(self, *args):
+            pass
+
+    class Server(http.server.ThreadingHTTPServer):
+        def handle_error(self, request, client_address):
+            pass  # The client drops connections it gave up on
+
+    server = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", received
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def bench_voiceover(args):
+    """Stream voiceovers from a local ElevenLabs stand-in, checking the retries and the cleanup of .part files.
+
+    Each scenario checks the number of requests made, that a successful voiceover
+    holds the whole body and that no partial file is left behind, also when every
+    attempt fails.
+    """
+    scenarios = [
+        ('200', [200], 1, True),
+        ('503, then 200', [503, 200], 2, True),
+        ('reset, then 200', ['reset', 200], 2, True),
+        ('503 every time', [503], 3, False),
+    ]
+    body = os.urandom(512 * 1024)
+    results = []
+    temp_dir = tempfile.mkdtemp(prefix='autoprayer_bench_')
+    try:
+        for name, responses, expected_requests, succeeds in scenarios:
+            output_path = os.path.join(temp_dir, f'voiceover_{len(results)}.mp3')
+            with voiceover_stand_in(responses, body) as (base_url, received):
+                client = VoiceoverClient('test-key', base_url, max_retries=2, backoff=0.01)
+                start = time.perf_counter()
+                try:
+                    client.synthesize(STUB_SCRIPT[2], output_path)
+                    error = None
+                except Exception as e:
+                    error = e
+                elapsed = time.perf_counter() - start
+                client.session.close()
+            ok = (len(received) == expected_requests and (error is None) == succeeds
+                  and not os.path.exists(f"{output_path}.part"))
+            if succeeds and ok:
+                with open(output_path, 'rb') as f:
+                    ok = f.read() == body
+            else:
+                ok = ok and not os.path.exists(output_path)
+            results.append({'benchmark': 'voiceover', 'input': 'stand-in', 'variant': name, 'fps': None,
+                            'speedup': None, 'seconds': elapsed, 'requests': len(received), 'ok': ok})
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+def bench_pipeline(args):
+    """Run the whole pipeline with stubbed APIs and report each stage separately.
+
+    Stage timings come from the run metrics: process_frame and composite are the time
+    spent in Python per frame, encode covers the whole frame loop including both.
+    """
+    results = []
+    temp_dir = tempfile.mkdtemp(prefix='autoprayer_bench_')
+    config = {
+        'anthropic_api_key': 'stub',
+        'elevenlabs_api_key': 'stub',
+        'content_cache': False,
+        'script_batch_size': 1,
+    }
+    durations = args.durations or [args.duration / 2, args.duration * 1.5]
+    metrics.configure(True, temp_dir)
+    metrics.drain()
+    try:
+        audio = synthetic_audio(os.path.join(temp_dir, 'voiceover.mp3'), args.duration)
+        for name, duration in itertools.product(args.backgrounds, durations):
+            input_name = f'{name}-{duration:g}s'
+            background = synthetic_video(os.path.join(temp_dir, f'{input_name}.mp4'), *BACKGROUNDS[name], duration)
+            start = time.perf_counter()
+            with stubbed_apis(audio):
+                for video in BatchPipeline(config, 1):
+                    create_final_video(background, video.audio_path, video.title, video.description,
+                                       os.path.join(temp_dir, f'{input_name}_out.mp4'), job=input_name,
+                                       backend=args.backend, encode_profile=args.profile, preset=args.preset)
+            elapsed = time.perf_counter() - start
+
+            stages = {}
+            for record in metrics.drain():
+                stage = stages.setdefault(record['stage'], {'seconds': 0.0, 'frames': 0})
+                stage['seconds'] += record['wall_s']
+                stage['frames'] += record['frames'] or 0
+            stages['total'] = {'seconds': elapsed, 'frames': int(min(args.duration, 59) * 30)}
+            for stage, totals in stages.items():
+                frames = totals['frames']
+                results.append({'benchmark': 'pipeline', 'input': input_name, 'variant': stage,
+                                'fps': frames / totals['seconds'] if frames and totals['seconds'] else None,
+                                'speedup': None, 'seconds': totals['seconds'], 'frames': frames or None})
+    finally:
+        metrics.configure(False)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+def bench_profiles(args):
+    """Render the same input with every encode profile, reporting encode speed, file size and PSNR."""
+    results = []
+    temp_dir = tempfile.mkdtemp(prefix='autoprayer_bench_')
+    try:
+        background = synthetic_video(os.path.join(temp_dir, 'background.mp4'), 1920, 1080, args.duration / 2)
+        audio = synthetic_audio(os.path.join(temp_dir, 'voiceover.mp3'), args.duration)
+        frames = int(args.duration * 30)
+        outputs = {}
+        for profile in args.profiles:
+            audio_copy = shutil.copy(audio, os.path.join(temp_dir, f'voiceover_{profile}.mp3'))
+            outputs[profile] = os.path.join(temp_dir, f'{profile}.mp4')
+            start = time.perf_counter()
+            create_final_video(background, audio_copy, "Oración de Prueba", "Una descripción de prueba",
+                               outputs[profile], backend=args.backend, encode_profile=profile)
+            elapsed = time.perf_counter() - start
+            results.append({'benchmark': 'profiles', 'input': '1080p', 'variant': profile,
+                            'fps': frames / elapsed, 'seconds': elapsed,
+                            'size_mb': os.path.getsize(outputs[profile]) / (1024 * 1024)})
+        baseline = results[0]
+        for row in results:
+            row['speedup'] = row['fps'] / baseline['fps']
+            row['psnr_vs_' + baseline['variant']] = psnr(outputs[baseline['variant']], outputs[row['variant']])
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+def count_frames(path):
+    """Number of video frames in path, by decoding it."""
+    result = subprocess.run([get_moviepy_setting("FFMPEG_BINARY"), '-i', path, '-map', '0:v', '-f', 'null', '-'],
+                            capture_output=True, text=True)
+    matches = re.findall(r'frame=\s*(\d+)', result.stderr)
+    return int(matches[-1]) if matches else 0
+
+def bench_segments(args):
+    """Render the same input serially and split into segments, reporting speed, frame count and PSNR."""
+    results = []
+    temp_dir = tempfile.mkdtemp(prefix='autoprayer_bench_')
+    try:
+        background = synthetic_video(os.path.join(temp_dir, 'background.mp4'), 1920, 1080, args.duration / 2)
+        audio = synthetic_audio(os.path.join(temp_dir, 'voiceover.mp3'), args.duration)
+        frames = int(args.duration * 30)
+        outputs = {}
+        for segments in [1] + [count for count in args.segments if count > 1]:
+            variant = 'serial' if segments == 1 else f'{segments} segments'
+            audio_copy = shutil.copy(audio, os.path.join(temp_dir, f'voiceover_{segments}.mp3'))
+            outputs[variant] = os.path.join(temp_dir, f'segments_{segments}.mp4')
+            start = time.perf_counter()
+            create_final_video(background, audio_copy, "Oración de Prueba", "Una descripción de prueba",
+                               outputs[variant], encode_profile=args.profile, preset=args.preset,
+                               segments=segments)
+            elapsed = time.perf_counter() - start
+            results.append({'benchmark': 'segments', 'input': '1080p', 'variant': variant,
+                            'fps': frames / elapsed, 'seconds': elapsed,
+                            'frames': count_frames(outputs[variant])})
+        baseline = results[0]
+        for row in results:
+            row['speedup'] = row['fps'] / baseline['fps']
+            row['psnr_vs_serial'] = psnr(outputs['serial'], outputs[row['variant']])
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+def _render_peak_rss(background, audio, output, memory_mb):
+    """Render in this process and return its peak RSS and how much of it the render added, in MB."""
+    # Count from here, not from whatever the interpreter, imports or a parent left behind
+    generate_video.reset_peak_rss()
+    start = generate_video.peak_rss_mb()
+    create_final_video(background, audio, "Oración de Prueba", "Una descripción de prueba", output,
+                       encode_profile='draft', memory_mb=memory_mb)
+    peak = generate_video.peak_rss_mb()
+    return peak, peak - start
+
+def bench_memory(args):
+    """Peak RSS of renders of increasing length from the largest of --backgrounds.
+
+    Each render runs in a fresh process that measures from its own baseline, so
+    render_rss_mb is what the render added. The background is either shorter than
+    every render, so it loops, or longer, so it is trimmed. Memory should stay flat
+    as the video gets longer: rss_growth_mb is render_rss_mb over the shortest
+    render of the same variant, and a row is flat when that stays within
+    --max-growth-mb.
+    """
+    results = []
+    temp_dir = tempfile.mkdtemp(prefix='autoprayer_bench_')
+    name = max(args.backgrounds, key=lambda background: BACKGROUNDS[background][0] * BACKGROUNDS[background][1])
+    lengths = sorted(args.lengths)
+    try:
+        for variant, background_duration in (('loop', lengths[0] / 2), ('trim', lengths[-1] + 1)):
+            background = synthetic_video(os.path.join(temp_dir, f'{variant}.mp4'), *BACKGROUNDS[name],
+                                         background_duration)
+            baseline = None
+            for length in lengths:
+                # create_final_video deletes the voiceover, so every render gets its own
+                audio = synthetic_audio(os.path.join(temp_dir, f'voiceover_{variant}_{length:g}.mp3'), length)
+                start = time.perf_counter()
+                with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    peak, render_rss = pool.submit(_render_peak_rss, background, audio,
+                                       os.path.join(temp_dir, f'{variant}_{length:g}.mp4'), args.memory_mb).result()
+                elapsed = time.perf_counter() - start
+                baseline = baseline if baseline is not None else render_rss
+                results.append({'benchmark': 'memory', 'input': f'{name}-{length:g}s', 'variant': variant,
+                                'fps': min(length, 59) * 30 / elapsed, 'speedup': None, 'seconds': elapsed,
+                                'peak_rss_mb': peak, 'render_rss_mb': render_rss,
+                                'rss_growth_mb': render_rss - baseline,
+                                'flat': render_rss - baseline <= args.max_growth_mb})
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+def parse_importtime(stderr, module):
+    """Cumulative import time of module and of each of its direct imports, in seconds, from -X importtime.
+
+    Imports are listed after their own imports, so the direct imports of module are
+    the depth 1 entries since the previous top level entry.
+    """
+    direct_imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            direct_imports[name.strip()] = int(cumulative) / 1e6
+        elif depth == 0:
+            if name.strip() == module:
+                return int(cumulative) / 1e6, direct_imports
+            direct_imports = {}
+    return 0.0, {}
+
+def bench_startup(args):
+    """Time a fresh interpreter importing generate_video, with its slowest direct imports from -X importtime."""
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+
+    def wall_time(*command):
+        samples = []
+        for _ in range(args.startup_runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *command], cwd=repo_dir, check=True, capture_output=True)
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples)
+
+    interpreter = wall_time('-c', 'pass')
+    results = [
+        {'benchmark': 'startup', 'input': 'wall', 'variant': 'python -c pass', 'seconds': interpreter},
+        {'benchmark': 'startup', 'input': 'wall', 'variant': 'import generate_video',
+         'seconds': wall_time('-c', 'import generate_video')},
+        {'benchmark': 'startup', 'input': 'wall', 'variant': 'generate_video.py --help',
+         'seconds': wall_time('generate_video.py', '--help')},
+    ]
+
+    runs = [parse_importtime(subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import generate_video'],
+                                            cwd=repo_dir, check=True, capture_output=True, text=True).stderr,
+                             'generate_video')
+            for _ in range(args.startup_runs)]
+    results.append({'benchmark': 'startup', 'input': 'importtime', 'variant': 'generate_video',
+                    'seconds': statistics.median(total for total, _ in runs)})
+    modules = {name for _, direct_imports in runs for name in direct_imports}
+    medians = {name: statistics.median(imports.get(name, 0.0) for _, imports in runs) for name in modules}
+    for name in sorted(medians, key=medians.get, reverse=True)[:5]:
+        results.append({'benchmark': 'startup', 'input': 'importtime', 'variant': name, 'seconds': medians[name]})
+    for row in results:
+        row.update(fps=None, speedup=None)
+    return results
+
+BENCHMARKS = {
+    'scaling': bench_scaling,
+    'compositing': bench_compositing,
+    'backends': bench_backends,
+    'frames': bench_frames,
+    'pipeline': bench_pipeline,
+    'profiles': bench_profiles,
+    'segments': bench_segments,
+    'memory': bench_memory,
+    'audio': bench_audio,
+    'voiceover': bench_voiceover,
+    'startup': bench_startup,
+}
+
+def run_metadata(args):
+    """Describe the commit, encoder settings and machine the results were measured on."""
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    commit = dirty = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=repo_dir,
+                                capture_output=True, text=True).stdout.strip() or None
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo_dir,
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        pass
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'profile': args.profile,
+        'segments': args.segments,
+        'preset': args.preset,
+        'backend': args.backend,
+        'frames': args.frames,
+        'duration': args.duration,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def format_number(value, width, suffix='', decimals=1):
+    if value is None:
+        return f"{'-':>{width}}"
+    return f"{value:>{width - len(suffix)}.{2 if suffix else decimals}f}{suffix}"
+
+def print_results(results):
+    print(f"\n{Colors.BOLD}{'benchmark':<12}{'input':<18}{'variant':<26}{'fps':>10}{'speedup':>10}"
+          f"{'seconds':>10}{Colors.RESET}")
+    for row in results:
+        line = (f"{row['benchmark']:<12}{row['input']:<18}{row['variant']:<26}"
+                f"{format_number(row['fps'], 10)}{format_number(row['speedup'], 10, 'x')}"
+                f"{format_number(row.get('seconds'), 10, decimals=3)}")
+        if 'size_mb' in row:
+            line += f"  {row['size_mb']:.1f} MB"
+        if row.get('frames') is not None:
+            line += f"  {row['frames']} frames"
+        if 'peak_rss_mb' in row:
+            line += (f"  peak RSS {row['peak_rss_mb']:.0f} MB, render {row['render_rss_mb']:.0f} MB "
+                     f"({row['rss_growth_mb']:+.0f} MB) "
+                     f"{Colors.GREEN + 'ok' if row['flat'] else Colors.RED + 'FAIL'}{Colors.RESET}")
+        if 'ok' in row:
+            line += (f"  {row['requests']} request(s) "
+                     f"{Colors.GREEN + 'ok' if row['ok'] else Colors.RED + 'FAIL'}{Colors.RESET}")
+        for key, value in row.items():
+            if key.startswith('psnr_vs_'):
+                line += f"  (PSNR vs {key[len('psnr_vs_'):]}: {value:.1f} dB)"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AutoPrayer render pipeline.")
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark', choices=[[]] + list(BENCHMARKS), default=[],
+                        help="Benchmarks to run (default: all)")
+    parser.add_argument('--frames', type=int, default=30, help="Frames to process per measurement")
+    parser.add_argument('--duration', type=float, default=10, help="Length in seconds of the rendered test videos")
+    parser.add_argument('--backgrounds', nargs='+', choices=list(BACKGROUNDS), default=list(BACKGROUNDS),
+                        help="Synthetic backgrounds for the frames and pipeline benchmarks (default: all)")
+    parser.add_argument('--durations', nargs='+', type=float,
+                        help="Background clip lengths for the pipeline benchmark "
+                             "(default: half and 1.5x --duration, so both the loop and trim paths run)")
+    parser.add_argument('--profile', choices=list(ENCODE_PROFILES), default='standard',
+                        help="Encode profile for the backends and pipeline benchmarks")
+    parser.add_argument('--profiles', nargs='+', choices=list(ENCODE_PROFILES), default=list(ENCODE_PROFILES),
+                        help="Encode profiles compared by the profiles benchmark, the first one is the baseline")
+    parser.add_argument('--segments', nargs='+', type=int, default=[2, 4],
+                        help="Segment counts compared against a serial render by the segments benchmark")
+    parser.add_argument('--lengths', nargs='+', type=float, default=[5, 10, 20],
+                        help="Video lengths in seconds rendered by the memory benchmark")
+    parser.add_argument('--memory-mb', type=int, help="Per-render memory budget for the memory benchmark")
+    parser.add_argument('--max-growth-mb', type=float, default=64,
+                        help="Render memory growth over the shortest render that the memory benchmark still "
+                             "counts as flat")
+    parser.add_argument('--preset', choices=X264_PRESETS, help="Override the x264 preset of --profile")
+    parser.add_argument('--backend', choices=['moviepy', 'ffmpeg'], default='moviepy',
+                        help="Render backend for the pipeline benchmark")
+    parser.add_argument('--startup-runs', type=int, default=5,
+                        help="Interpreter launches per startup measurement, the median is reported")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.benchmarks or BENCHMARKS:
+        print(f"{Colors.BLUE}Running {name} benchmark...{Colors.RESET}")
+        results.extend(BENCHMARKS[name](args))
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': run_metadata(args), 'results': results}, f, indent=4)
+        print(f"\nResults saved to {args.output}")
+    growing = any(row.get('flat') is False for row in results)
+    if growing:
+        print(f"\n{Colors.RED}Render memory grew by more than {args.max_growth_mb:g} MB with video length{Colors.RESET}")
+    failed = [row['variant'] for row in results if row.get('ok') is False]
+    if failed:
+        print(f"\n{Colors.RED}Voiceover checks failed: {', '.join(failed)}{Colors.RESET}")
+    if growing or failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
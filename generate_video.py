@@ -1,21 +1,73 @@
 import os
 import json
+import re
 import random
 import time
 from pathlib import Path
-from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip, concatenate_videoclips, TextClip
-import anthropic
-from elevenlabs import generate, set_api_key, save
-import numpy as np
-from PIL import Image
+import importlib
+import math
+import functools
 from proglog import ProgressBarLogger
 import sys
 import threading
 import itertools
 import subprocess
-from moviepy.config import change_settings
-import requests
-from tqdm import tqdm
+import multiprocessing
+import traceback
+import tempfile
+import shutil
+import hashlib
+import argparse
+import uuid
+import contextlib
+import csv
+import signal
+import queue
+import cProfile
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+class _LazyModule:
+    """Import a module on first attribute access, so each command only pays for the modules it uses."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+def _lazy_attribute(module, name):
+    """Stand-in for a function or class of a lazily imported module, resolved on the first call."""
+    def call(*args, **kwargs):
+        return getattr(module, name)(*args, **kwargs)
+    call.__name__ = name
+    return call
+
+# Importing moviepy, anthropic and elevenlabs takes most of a second, so they load on first use.
+# moviepy's submodules are used instead of moviepy.editor, which also pulls in IPython.
+np = _LazyModule('numpy')
+Image = _LazyModule('PIL.Image')
+ImageDraw = _LazyModule('PIL.ImageDraw')
+ImageFont = _LazyModule('PIL.ImageFont')
+anthropic = _LazyModule('anthropic')
+elevenlabs = _LazyModule('elevenlabs')
+requests = _LazyModule('requests')
+_moviepy_config = _LazyModule('moviepy.config')
+_moviepy_video_clip = _LazyModule('moviepy.video.VideoClip')
+VideoFileClip = _lazy_attribute(_LazyModule('moviepy.video.io.VideoFileClip'), 'VideoFileClip')
+concatenate_videoclips = _lazy_attribute(_LazyModule('moviepy.video.compositing.concatenate'),
+                                         'concatenate_videoclips')
+VideoClip = _lazy_attribute(_moviepy_video_clip, 'VideoClip')
+ImageClip = _lazy_attribute(_moviepy_video_clip, 'ImageClip')
+TextClip = _lazy_attribute(_moviepy_video_clip, 'TextClip')
+change_settings = _lazy_attribute(_moviepy_config, 'change_settings')
+get_moviepy_setting = _lazy_attribute(_moviepy_config, 'get_setting')
+ffmpeg_parse_infos = _lazy_attribute(_LazyModule('moviepy.video.io.ffmpeg_reader'), 'ffmpeg_parse_infos')
+FFMPEG_VideoWriter = _lazy_attribute(_LazyModule('moviepy.video.io.ffmpeg_writer'), 'FFMPEG_VideoWriter')
+tqdm = _lazy_attribute(_LazyModule('tqdm'), 'tqdm')
 
 def download_file(url, destination, desc=None):
     response = requests.get(url, stream=True)
@@ -34,9 +86,10 @@ def setup_background_videos():
     if not video_dir.exists():
         video_dir.mkdir(parents=True, exist_ok=True)
     
-    if not list(video_dir.glob('*.mp4')):
-        time.sleep(1)
-        os.system('cls')
+    # Probe new or changed videos now, so picking a background later is instant
+    library = BackgroundLibrary.from_config(load_settings())
+    if not process_with_spinner("Indexing background videos...", library.refresh):
+        clear_screen()
         print(f"\n{Colors.YELLOW}No background videos found!{Colors.RESET}")
         while True:
             response = input(f"\n{Colors.BOLD}Would you like to download the starter background videos pack? (y/n):{Colors.RESET} ").strip().lower()
@@ -81,25 +134,41 @@ def setup_background_videos():
             print(f"\n{Colors.YELLOW}Please add your own background videos to the {video_dir} directory.{Colors.RESET}")
             sys.exit(1)
 
-def setup_imagemagick():
-    """Install and configure ImageMagick for MoviePy."""
+def clear_screen():
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+def open_output_dir():
+    """Open the output folder in Explorer on Windows, or just print where it is elsewhere."""
+    output_dir = Path('output').absolute()
+    if sys.platform == 'win32':
+        os.startfile(output_dir)
+    else:
+        print(f"Videos saved in {output_dir}")
+
+def setup_imagemagick(config=None):
+    """Configure ImageMagick for MoviePy.
+
+    The binary found is saved as "imagemagick_binary" in config.json, so later
+    launches skip the search.
+    """
+    cached_path = (config or {}).get('imagemagick_binary')
+    if cached_path and os.path.isfile(cached_path):
+        change_settings({"IMAGEMAGICK_BINARY": cached_path})
+        return
+    
     magick_path = r'C:\Program Files\ImageMagick-7.1.1-Q16-HDRI\magick.exe'
     
-    if os.path.exists(magick_path):
-        change_settings({"IMAGEMAGICK_BINARY": magick_path})
-        print(f'ImageMagick configured at: {magick_path}')
+    # ImageMagick 6 on Linux only ships convert, Windows has an unrelated convert.exe
+    found_path = magick_path if os.path.exists(magick_path) else (
+        shutil.which('magick') or (shutil.which('convert') if os.name != 'nt' else None)
+    )
+    if found_path:
+        change_settings({"IMAGEMAGICK_BINARY": found_path})
+        print(f'ImageMagick found at: {found_path}')
+        remember_setting('imagemagick_binary', found_path)
+        if config is not None:
+            config['imagemagick_binary'] = found_path
         return
-    
-    try:
-        result = subprocess.run(['where', 'magick'], capture_output=True, text=True)
-        if result.returncode == 0:
-            # Get the first path from the where command
-            magick_path = result.stdout.strip().split('\n')[0]
-            change_settings({"IMAGEMAGICK_BINARY": magick_path})
-            print(f'ImageMagick found in PATH at: {magick_path}')
-            return
-    except Exception:
-        pass
 
     print(f'{Colors.RED}ImageMagick not found at expected location: {magick_path}{Colors.RESET}')
     print('Please ensure that:')
@@ -179,8 +248,35 @@ class CustomLogger(ProgressBarLogger):
                         print(f"{Colors.GREEN}Video creation completed!{Colors.RESET}")
                     self.last_message = message
 
+class QueueProgressLogger(ProgressBarLogger):
+    """Forward render progress from a worker process to the RenderScheduler."""
+    def __init__(self, job_id, progress_queue):
+        super().__init__()
+        self.job_id = job_id
+        self.progress_queue = progress_queue
+        self.last_percentage = -1
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        if bar == "t" and attr == "index":
+            total = self.bars[bar]["total"]
+            percentage = int((value / total) * 100) if total else 0
+            # Only report whole percent steps to keep the queue traffic low
+            if percentage != self.last_percentage:
+                self.last_percentage = percentage
+                self.progress_queue.put((self.job_id, value, total))
+
+# Set in render worker processes, where console output would interleave
+_quiet = False
+
+def console_print(*args, **kwargs):
+    """Print to the console unless running inside a render worker."""
+    if not _quiet:
+        print(*args, **kwargs)
+
 def process_with_spinner(message, func, *args, **kwargs):
     """Execute a function with a spinner animation."""
+    if _quiet:
+        return func(*args, **kwargs)
     spinner = Spinner(message)
     spinner.start()
     try:
@@ -193,19 +289,598 @@ def process_with_spinner(message, func, *args, **kwargs):
         print(f"\r{message} {Colors.RED}Failed!{Colors.RESET}")
         raise e
 
-print('Verifying system requirements..')
-print('System requirements verified.')
-time.sleep(0.5)
-os.system('cls')
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None when it can't be read."""
+    try:
+        # Linux: VmHWM can be reset, unlike ru_maxrss which a forked child inherits from its parent
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+def available_memory_mb():
+    """Memory the system can still hand out without swapping, in MB, or None when it can't be read."""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        return None
+
+def reset_peak_rss():
+    """Restart peak_rss_mb from the current resident memory, where the OS allows it (Linux)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def process_alive(pid):
+    """Whether a process with this PID is running, assuming it is when that can't be checked."""
+    if os.name == 'nt':
+        try:
+            import psutil
+            return psutil.pid_exists(pid)
+        except ImportError:
+            return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _cpu_seconds():
+    # Includes finished child processes, so ffmpeg encodes are counted where the OS reports them
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+class RunMetrics:
+    """Wall/CPU time, frames/sec, bytes written and peak RSS for each pipeline stage.
+
+    When disabled, ``stage`` is a no-op context manager and ``wrap_frames`` returns
+    the frame function unchanged, so the render loop pays nothing.
+    """
+
+    def __init__(self, enabled=False, report_dir='reports', profiler=None):
+        self.enabled = enabled
+        self.report_dir = Path(report_dir)
+        self.profiler = profiler
+        self.run_id = time.strftime('%Y%m%d_%H%M%S')
+        self.records = []
+        self._lock = threading.Lock()
+
+    def configure(self, enabled, report_dir='reports', profiler=None):
+        self.enabled = enabled
+        self.report_dir = Path(report_dir)
+        self.profiler = profiler
+
+    def add(self, stage, job=None, wall=0.0, cpu=None, frames=None, bytes_written=None, **details):
+        if not self.enabled:
+            return
+        record = {
+            'stage': stage,
+            'job': job,
+            'wall_s': round(wall, 4),
+            'cpu_s': None if cpu is None else round(cpu, 4),
+            'frames': frames,
+            'fps': round(frames / wall, 2) if frames and wall else None,
+            'bytes': bytes_written,
+            'peak_rss_mb': peak_rss_mb(),
+            'pid': os.getpid(),
+            **details,
+        }
+        with self._lock:
+            self.records.append(record)
+
+    @contextlib.contextmanager
+    def stage(self, name, job=None, frames=None, output_path=None, **details):
+        """Time a block, recording the size of output_path afterwards if given."""
+        if not self.enabled:
+            yield
+            return
+        wall_start, cpu_start = time.perf_counter(), _cpu_seconds()
+        yield
+        bytes_written = None
+        if output_path and os.path.exists(output_path):
+            bytes_written = os.path.getsize(output_path)
+        self.add(name, job, time.perf_counter() - wall_start, _cpu_seconds() - cpu_start, frames, bytes_written,
+                 **details)
+
+    def wrap_frames(self, name, job, func):
+        """Wrap a per-frame function to accumulate its time; call the returned flush() when done."""
+        if not self.enabled:
+            return func, lambda: None
+        totals = {'wall': 0.0, 'cpu': 0.0, 'frames': 0}
+
+        def timed(frame):
+            wall_start, cpu_start = time.perf_counter(), time.thread_time()
+            result = func(frame)
+            totals['wall'] += time.perf_counter() - wall_start
+            totals['cpu'] += time.thread_time() - cpu_start
+            totals['frames'] += 1
+            return result
+
+        def flush():
+            if totals['frames']:
+                self.add(name, job, totals['wall'], totals['cpu'], totals['frames'])
+        return timed, flush
+
+    @contextlib.contextmanager
+    def profile(self, job):
+        """Profile the frame loop with cProfile or pyinstrument when a profiler is configured."""
+        if not self.enabled or not self.profiler:
+            yield
+            return
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        if self.profiler == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                console_print(f"{Colors.YELLOW}pyinstrument is not installed, skipping profiling{Colors.RESET}")
+                yield
+                return
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                report_path = self.report_dir / f"profile_{self.run_id}_{job}.html"
+                report_path.write_text(profiler.output_html(), encoding='utf-8')
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(str(self.report_dir / f"profile_{self.run_id}_{job}.prof"))
+
+    def drain(self):
+        """Remove and return the collected records, to send them from a worker to the parent."""
+        with self._lock:
+            records, self.records = self.records, []
+        return records
+
+    def extend(self, records):
+        with self._lock:
+            self.records.extend(records)
+
+    def write_report(self):
+        """Write the records to reports/run_<timestamp>.json and .csv, returning the JSON path."""
+        if not self.enabled or not self.records:
+            return None
+        self.report_dir.mkdir(parents=True, exist_ok=True)
+        base_path = self.report_dir / f"run_{self.run_id}"
+        with open(f"{base_path}.json", 'w') as f:
+            json.dump({'run_id': self.run_id, 'cpu_count': os.cpu_count(), 'stages': self.records}, f, indent=4)
+        with open(f"{base_path}.csv", 'w', newline='') as f:
+            # Stages can add their own columns, e.g. the encode profile
+            fieldnames = list(dict.fromkeys(key for record in self.records for key in record))
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(self.records)
+        return f"{base_path}.json"
+
+# Shared by every stage of the run, enabled with the "metrics" setting
+metrics = RunMetrics()
 
 CONFIG_FILE = 'config.json'
 
+# Optional settings that can be overridden in config.json
+DEFAULT_SETTINGS = {
+    "script_workers": 2,      # Concurrent Claude requests
+    "voiceover_workers": 2,   # Concurrent ElevenLabs requests
+    "prefetch": 2,            # Videos prepared ahead of the one being rendered
+    "render_workers": 1,      # Videos rendered in parallel, each in its own process
+    "render_threads": "auto", # Encoder threads shared by all render workers ("auto" = all available cores)
+    "render_segments": 1,     # Split each MoviePy render into this many segments rendered in parallel
+    "segment_gop": 60,        # Segment boundaries fall on multiples of this many frames
+    "render_memory_mb": None, # Memory budget of each render, limits parallel renders to what fits (None = no limit)
+    "encode_profile": "standard",
+    "encode_profiles": {},    # Extra or overridden encode profiles, see ENCODE_PROFILES
+    "scaling_mode": "lanczos",  # Background scaling quality: lanczos, bilinear or area
+    "render_backend": "moviepy",  # moviepy, or ffmpeg to render with a single ffmpeg filter graph
+    "background_cache": True,     # Reuse backgrounds pre-scaled to 1080x1920
+    "background_cache_dir": "cache/backgrounds",
+    "background_cache_max_mb": 4096,
+    "background_library_index": "cache/background_library.json",  # Probed metadata of every background
+    "text_renderer": "pillow",    # pillow, or imagemagick for the original TextClip captions
+    "imagemagick_binary": None,   # Found on first use and saved here
+    "loop_cache_max_mb": 1024,    # RAM for the frames of a looped background
+    "loop_spill_max_mb": 8192,    # Disk for looped frames that don't fit in RAM (0 = re-decode instead)
+    "content_cache": True,        # Keep generated scripts and voiceovers for re-renders
+    "content_cache_dir": "cache",
+    "script_cache_max_mb": 50,
+    "voiceover_cache_max_mb": 1024,
+    "audio_cache_max_mb": 512,    # Trimmed, loudness-normalized AAC of each voiceover
+    "audio_loudness": -14,        # Voiceover loudness target in LUFS (EBU R128), None to keep the original levels
+    "script_batch_size": 5,       # Prayers requested per Claude call (1 = one call per video)
+    "anthropic_base_url": None,   # Override the Claude API endpoint, e.g. for a local mock server
+    "elevenlabs_base_url": None,  # Override the ElevenLabs API endpoint
+    "metrics": False,             # Write a per-stage timing report for each run
+    "metrics_dir": "reports",
+    "profile_frames": None,       # cprofile or pyinstrument to profile the frame loop
+    "spool_dir": "spool",         # Job queue of the worker command
+    "spool_poll_interval": 2,     # Seconds between checks for new jobs when the queue is empty
+}
+
+def get_setting(config, key):
+    """Read an optional setting from the config, falling back to its default."""
+    return config.get(key, DEFAULT_SETTINGS[key])
+
+def available_cores():
+    """CPU cores this process may run on, which can be fewer than the machine has."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def get_render_threads(config):
+    threads = get_setting(config, 'render_threads')
+    return available_cores() if threads in (None, 'auto') else int(threads)
+
+X264_PRESETS = ['ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium', 'slow', 'slower', 'veryslow']
+
+# x264 settings for the final encode. Each profile uses exactly one of crf,
+# bitrate or target_mb; target_mb encodes in two passes to land on that file size.
+ENCODE_PROFILES = {
+    'standard': {'preset': 'medium', 'bitrate': '8000k'},
+    'draft': {'preset': 'ultrafast', 'crf': 28},
+    'publish': {'preset': 'slow', 'crf': 20},
+    'size': {'preset': 'medium', 'target_mb': 25},
+}
+
+AUDIO_BITRATE_KBPS = 192
+
+# Output format of every x264 encode
+X264_OUTPUT_PARAMS = [
+    '-pix_fmt', 'yuv420p',
+    '-profile:v', 'main',
+    '-level', '4.0'         # Compatibility level
+]
+
+def get_encode_profile(profile, config=None):
+    """Resolve a profile name, built in or from the "encode_profiles" setting, into its settings."""
+    if isinstance(profile, dict):
+        return profile
+    profiles = {**ENCODE_PROFILES, **(get_setting(config, 'encode_profiles') if config else {})}
+    if profile not in profiles:
+        raise ValueError(f"Unknown encode profile '{profile}', expected one of: {', '.join(profiles)}")
+    settings = {'name': profile, 'preset': 'medium', **profiles[profile]}
+    if sum(key in settings for key in ('crf', 'bitrate', 'target_mb')) != 1:
+        raise ValueError(f"Encode profile '{profile}' needs exactly one of crf, bitrate or target_mb")
+    if settings['preset'] not in X264_PRESETS:
+        raise ValueError(f"Encode profile '{profile}' has an unknown preset: {settings['preset']}")
+    return settings
+
+def video_rate_args(profile, duration):
+    """x264 rate control arguments: a CRF, a fixed bitrate, or the bitrate that fits target_mb."""
+    if 'crf' in profile:
+        return ['-crf', str(profile['crf'])]
+    if 'bitrate' in profile:
+        return ['-b:v', str(profile['bitrate'])]
+    # Leave 2% of the target for the MP4 container
+    total_kbps = profile['target_mb'] * 8 * 1024 * 1024 * 0.98 / 1000 / max(duration, 1)
+    return ['-b:v', f"{max(100, int(total_kbps - AUDIO_BITRATE_KBPS))}k"]
+
+def is_two_pass(profile):
+    return 'target_mb' in profile
+
+def render_options(config):
+    """Collect the create_final_video keyword arguments configured in config.json."""
+    return {
+        'encode_profile': get_encode_profile(get_setting(config, 'encode_profile'), config),
+        'scaling_mode': get_setting(config, 'scaling_mode'),
+        'backend': get_setting(config, 'render_backend'),
+        'background_cache': BackgroundCache.from_config(config),
+        'text_renderer': get_setting(config, 'text_renderer'),
+        'loop_cache_mb': get_setting(config, 'loop_cache_max_mb'),
+        'loop_spill_mb': get_setting(config, 'loop_spill_max_mb'),
+        'segments': int(get_setting(config, 'render_segments')),
+        'segment_gop': int(get_setting(config, 'segment_gop')),
+        'memory_mb': get_setting(config, 'render_memory_mb'),
+        'audio_cache': create_audio_cache(config),
+        'loudness': get_setting(config, 'audio_loudness'),
+    }
+
+def configure_metrics(config):
+    """Enable the run report and profiler as configured in config.json."""
+    metrics.configure(
+        bool(get_setting(config, 'metrics')),
+        get_setting(config, 'metrics_dir'),
+        get_setting(config, 'profile_frames')
+    )
+
+def load_settings():
+    """Read config.json without prompting, for commands that don't need the API keys."""
+    if os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, 'r') as f:
+            return json.load(f)
+    return {}
+
+def remember_setting(key, value):
+    """Save one setting to config.json, leaving the rest of the file as it is."""
+    config = load_settings()
+    config[key] = value
+    with open(CONFIG_FILE, 'w') as f:
+        json.dump(config, f, indent=4)
+
 def resize_frame(frame, target_size):
     """Resize a single frame using PIL."""
     img = Image.fromarray(frame)
     resized = img.resize(target_size, Image.Resampling.LANCZOS)
     return np.array(resized)
 
+# PIL resampling filter for each scaling mode
+SCALING_MODES = {
+    'lanczos': 'LANCZOS',
+    'bilinear': 'BILINEAR',
+    'area': 'BOX',
+}
+
+# Filter support radius in source pixels at scale 1.0
+_SCALING_SUPPORT = {'lanczos': 3, 'bilinear': 1, 'area': 1}
+
+class FrameScaler:
+    """Scale and center-crop frames to the target size in a single resize.
+
+    The source crop window is worked out once per clip, so each frame only copies
+    and resamples the pixels that end up in the output, instead of resizing the
+    whole frame and throwing most of it away. The crop and output arrays are
+    allocated once and reused for every frame.
+    """
+
+    def __init__(self, source_size, target_size=(1080, 1920), mode='lanczos'):
+        if mode not in SCALING_MODES:
+            raise ValueError(f"Unknown scaling mode '{mode}', expected one of: {', '.join(SCALING_MODES)}")
+        src_w, src_h = source_size
+        target_w, target_h = target_size
+        self.resample = getattr(Image.Resampling, SCALING_MODES[mode])
+        self.target_size = target_size
+        
+        # Scale to the target height and crop the center, like the original resize path.
+        # Sources narrower than the target are scaled to the target width instead.
+        scaled_w = int(target_h * src_w / src_h)
+        scaled_w = scaled_w + (scaled_w % 2)
+        if scaled_w >= target_w:
+            scale_x, scale_y = scaled_w / src_w, target_h / src_h
+            start_x, start_y = scaled_w // 2 - target_w // 2, 0
+        else:
+            scaled_h = int(target_w * src_h / src_w)
+            scale_x, scale_y = target_w / src_w, scaled_h / src_h
+            start_x, start_y = 0, scaled_h // 2 - target_h // 2
+        box = (
+            start_x / scale_x,
+            start_y / scale_y,
+            (start_x + target_w) / scale_x,
+            (start_y + target_h) / scale_y,
+        )
+        
+        # Copy a few extra source pixels around the box so the filter sees the same
+        # neighbourhood it would in the full frame
+        margin = math.ceil(_SCALING_SUPPORT[mode] * max(1.0, 1 / min(scale_x, scale_y))) + 1
+        self.x0 = max(0, int(box[0]) - margin)
+        self.y0 = max(0, int(box[1]) - margin)
+        self.x1 = min(src_w, math.ceil(box[2]) + margin)
+        self.y1 = min(src_h, math.ceil(box[3]) + margin)
+        self.box = (box[0] - self.x0, box[1] - self.y0, box[2] - self.x0, box[3] - self.y0)
+        
+        self.window = np.empty((self.y1 - self.y0, self.x1 - self.x0, 3), dtype=np.uint8)
+        self.output = np.empty((target_h, target_w, 3), dtype=np.uint8)
+
+    def __call__(self, frame):
+        np.copyto(self.window, frame[self.y0:self.y1, self.x0:self.x1, :3])
+        resized = Image.fromarray(self.window).resize(self.target_size, self.resample, box=self.box)
+        np.copyto(self.output, np.asarray(resized))
+        return self.output
+
+class FrameBufferPool:
+    """A fixed ring of frame buffers that frames are read into instead of new arrays.
+
+    MoviePy's reader allocates a new array for every frame it decodes, about 25 MB
+    per frame for a 4K source. With a pool attached, each frame is read into the
+    next of ``size`` preallocated buffers instead, and stays valid until ``size``
+    more frames have been read. Frames are handed out read-only, so later stages
+    copy them instead of drawing on the pool.
+    """
+
+    def __init__(self, shape, size=2):
+        self.buffers = [np.empty(shape, dtype=np.uint8) for _ in range(size)]
+        self.next_index = 0
+
+    def next_buffer(self):
+        buffer = self.buffers[self.next_index]
+        self.next_index = (self.next_index + 1) % len(self.buffers)
+        return buffer
+
+    @classmethod
+    def attach(cls, clip, size=2):
+        """Make a VideoFileClip's reader decode into a new pool."""
+        reader = clip.reader
+        width, height = reader.size
+        pool = cls((height, width, reader.depth), size)
+        reader.read_frame = functools.partial(pool.read_frame, reader)
+        return pool
+
+    def read_frame(self, reader):
+        buffer = self.buffers[self.next_index]
+        data = buffer.data.cast('B')
+        filled = 0
+        while filled < len(data):
+            count = reader.proc.stdout.readinto(data[filled:])
+            if not count:
+                break
+            filled += count
+        if filled < len(data):
+            # Past the end of the stream, repeat the last frame like MoviePy does
+            if not hasattr(reader, 'lastread'):
+                raise IOError(f"Failed to read the first frame of {reader.filename}")
+            return reader.lastread
+        self.next_index = (self.next_index + 1) % len(self.buffers)
+        frame = buffer.view()
+        frame.flags.writeable = False
+        reader.lastread = frame
+        return frame
+
+class StaticOverlayCompositor:
+    """Blend static RGBA overlays onto frames in place.
+
+    The premultiplied colour, inverse alpha and bounding box of each overlay are
+    worked out once, so every frame only touches the rows and columns an overlay
+    actually covers, using preallocated scratch buffers instead of MoviePy's
+    general per-frame compositing.
+    """
+
+    def __init__(self, overlays, frame_size=(1080, 1920)):
+        frame_w, frame_h = frame_size
+        self.frame = np.empty((frame_h, frame_w, 3), dtype=np.uint8)
+        self.layers = []
+        for rgba, (x, y) in overlays:
+            alpha = rgba[:, :, 3]
+            if x == 'center':
+                x = (frame_w - rgba.shape[1]) // 2
+            rows = np.flatnonzero(alpha.any(axis=1))
+            cols = np.flatnonzero(alpha.any(axis=0))
+            if not rows.size:
+                continue
+            # Bounding box of the visible pixels, clipped to the frame
+            top, bottom = max(rows[0], -y), min(rows[-1] + 1, frame_h - y)
+            left, right = max(cols[0], -x), min(cols[-1] + 1, frame_w - x)
+            if top >= bottom or left >= right:
+                continue
+            
+            opacity = alpha[top:bottom, left:right, None].astype(np.float32) / 255
+            # +0.5 so the truncating cast back to uint8 rounds
+            premultiplied = rgba[top:bottom, left:right, :3].astype(np.float32) * opacity + 0.5
+            self.layers.append((
+                slice(y + top, y + bottom),
+                slice(x + left, x + right),
+                premultiplied,
+                1 - opacity,
+                np.empty(premultiplied.shape, dtype=np.float32),
+            ))
+
+    def __call__(self, frame):
+        if not frame.flags.writeable:
+            # Frames straight from the decoder are read-only
+            np.copyto(self.frame, frame[:, :, :3])
+            frame = self.frame
+        for rows, cols, premultiplied, inverse_opacity, scratch in self.layers:
+            region = frame[rows, cols]
+            np.multiply(region, inverse_opacity, out=scratch)
+            np.add(scratch, premultiplied, out=scratch)
+            np.copyto(region, scratch, casting='unsafe')
+        return frame
+
+class LoopFrameCache:
+    """Processed frames of a short background, decoded once and replayed on every loop.
+
+    Frames are kept in memory while they fit in ``max_memory_mb``, otherwise in a
+    temporary file of up to ``max_spill_mb`` that is read back into a small buffer
+    pool, so spilled frames sit in the page cache instead of the process's memory.
+    Use ``create`` to get None when the clip fits in neither, so the caller can fall
+    back to re-decoding. Once every frame is cached, ``release`` is called to free
+    the decoder early.
+    """
+
+    def __init__(self, clip, shape, spill_path=None, release=None):
+        self.clip = clip
+        self.fps = clip.fps
+        self.period = clip.duration
+        self.frame_count = shape[0]
+        self.filled = np.zeros(self.frame_count, dtype=bool)
+        self.missing = self.frame_count
+        self.spill_path = spill_path
+        self.release = release
+        if spill_path is None:
+            self.frames = np.empty(shape, dtype=np.uint8)
+        else:
+            self.frames = None
+            self.spill = open(spill_path, 'r+b')
+            self.pool = FrameBufferPool(shape[1:])
+
+    @classmethod
+    def create(cls, clip, max_memory_mb=1024, max_spill_mb=8192, release=None):
+        frame_count = max(1, int(clip.duration * clip.fps))
+        width, height = clip.size
+        size_mb = frame_count * width * height * 3 / (1024 * 1024)
+        shape = (frame_count, height, width, 3)
+        if size_mb <= max_memory_mb:
+            return cls(clip, shape, release=release)
+        if size_mb <= max_spill_mb:
+            fd, spill_path = tempfile.mkstemp(prefix='autoprayer_loop_', suffix='.raw')
+            os.close(fd)
+            return cls(clip, shape, spill_path, release)
+        return None
+
+    def _decode(self, index):
+        frame = self.clip.get_frame(index / self.fps)
+        self.filled[index] = True
+        self.missing -= 1
+        if not self.missing and self.release is not None:
+            self.clip = None
+            self.release()
+            self.release = None
+        return frame
+
+    def get_frame(self, t):
+        index = min(int((t % self.period) * self.fps + 1e-6), self.frame_count - 1)
+        if self.frames is not None:
+            if not self.filled[index]:
+                self.frames[index] = self._decode(index)
+            frame = self.frames[index].view()
+        else:
+            frame = self.pool.next_buffer()
+            self.spill.seek(index * frame.nbytes)
+            if self.filled[index]:
+                self.spill.readinto(frame.data.cast('B'))
+            else:
+                np.copyto(frame, self._decode(index))
+                self.spill.write(frame.data)
+            frame = frame.view()
+        # Read-only, so later stages copy the frame instead of drawing on the cache
+        frame.flags.writeable = False
+        return frame
+
+    def looped_clip(self, duration):
+        """A clip that plays the cached frames in a loop for the given duration."""
+        return VideoClip(self.get_frame, duration=duration)
+
+    def close(self):
+        frames, self.frames = self.frames, None
+        del frames
+        if self.spill_path:
+            self.spill.close()
+            if os.path.exists(self.spill_path):
+                try:
+                    os.remove(self.spill_path)
+                except Exception:
+                    pass
+
 def setup_api_keys():
     """Set up API keys interactively if they don't exist."""
     if os.path.exists(CONFIG_FILE):
@@ -228,26 +903,519 @@ def setup_api_keys():
     
     return config
 
-def get_random_background_video():
-    """Get a random video from the background-videos directory."""
-    video_dir = Path('resources/background-videos')
-    video_files = list(video_dir.glob('*.mp4'))
-    if not video_files:
-        raise Exception("No video files found in resources/background-videos")
-    return str(random.choice(video_files))
-
-def generate_script_from_claude(api_key):
-    """Generate script content using Claude API."""
-    client = anthropic.Anthropic(
-        api_key=api_key
+def evict_lru(directory, pattern, max_size_mb, keep=None):
+    """Delete the least recently used files matching pattern until they fit in max_size_mb.
+
+    Recency is the file's mtime, which the caches bump on every hit.
+    """
+    entries = [path for path in Path(directory).glob(pattern) if '.tmp' not in path.suffixes]
+    entries.sort(key=lambda path: path.stat().st_mtime)
+    total = sum(path.stat().st_size for path in entries)
+    limit = max_size_mb * 1024 * 1024
+    for path in entries:
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        total -= path.stat().st_size
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+class ContentCache:
+    """Persistent store of generated files, addressed by a hash of the inputs that produced them."""
+
+    def __init__(self, cache_dir, max_size_mb, suffix):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_mb = max_size_mb
+        self.suffix = suffix
+
+    @staticmethod
+    def make_key(**inputs):
+        """Hash the inputs in a stable order."""
+        encoded = json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def path_for(self, key):
+        return self.cache_dir / f"{key}{self.suffix}"
+
+    def get(self, key):
+        """Return the path of a cached entry, or None."""
+        path = self.path_for(key)
+        if not path.exists():
+            return None
+        os.utime(path)  # Mark as recently used
+        return path
+
+    def put_file(self, key, source_path):
+        """Copy a file into the cache."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        temp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp{self.suffix}")
+        shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, path)
+        evict_lru(self.cache_dir, f"*{self.suffix}", self.max_size_mb, keep=path)
+        return path
+
+    def get_json(self, key):
+        path = self.get(key)
+        if path is None:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def put_json(self, key, data):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        temp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp{self.suffix}")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(temp_path, path)
+        evict_lru(self.cache_dir, f"*{self.suffix}", self.max_size_mb, keep=path)
+        return path
+
+    def entries(self):
+        """Paths of all entries, most recently used first."""
+        paths = [path for path in self.cache_dir.glob(f"*{self.suffix}") if '.tmp' not in path.suffixes]
+        return sorted(paths, key=lambda path: path.stat().st_mtime, reverse=True)
+
+def create_content_caches(config):
+    """Return the (script, voiceover) caches configured in config.json, or (None, None)."""
+    if not get_setting(config, 'content_cache'):
+        return None, None
+    cache_dir = Path(get_setting(config, 'content_cache_dir'))
+    return (
+        ContentCache(cache_dir / 'scripts', get_setting(config, 'script_cache_max_mb'), '.json'),
+        ContentCache(cache_dir / 'voiceovers', get_setting(config, 'voiceover_cache_max_mb'), '.mp3'),
     )
+
+def create_audio_cache(config):
+    """Return the cache of render-ready voiceover audio configured in config.json, or None."""
+    if not get_setting(config, 'content_cache'):
+        return None
+    return ContentCache(Path(get_setting(config, 'content_cache_dir')) / 'audio',
+                        get_setting(config, 'audio_cache_max_mb'), '.m4a')
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class BackgroundCache:
+    """Background videos transcoded once to a render-ready 1080x1920, 30 fps intermediate.
+
+    Entries are keyed by the source's content hash and the target parameters, so a
+    renamed file still hits the cache and changing the parameters never serves a
+    stale copy. The least recently used entries are evicted once the cache grows
+    past ``max_size_mb``. A ``.lock`` file next to an entry being transcoded makes
+    other processes that need it wait for it instead of transcoding it again.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, cache_dir='cache/backgrounds', max_size_mb=4096, size=(1080, 1920), fps=30,
+                 gop=15, crf=16, scaling_mode='lanczos'):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_mb = max_size_mb
+        self.size = size
+        self.fps = fps
+        self.gop = gop
+        self.crf = crf
+        self.scaling_mode = scaling_mode
+
+    @classmethod
+    def from_config(cls, config):
+        """Create the cache configured in config.json, or None when it is disabled."""
+        if not get_setting(config, 'background_cache'):
+            return None
+        return cls(
+            get_setting(config, 'background_cache_dir'),
+            get_setting(config, 'background_cache_max_mb'),
+            scaling_mode=get_setting(config, 'scaling_mode')
+        )
+
+    @property
+    def params_tag(self):
+        width, height = self.size
+        return f"{width}x{height}_{self.fps}fps_g{self.gop}_crf{self.crf}_{self.scaling_mode}"
+
+    def _load_index(self):
+        try:
+            with open(self.cache_dir / self.INDEX_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_dir / f"{self.INDEX_FILE}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(index, f, indent=4)
+        os.replace(temp_path, self.cache_dir / self.INDEX_FILE)
+
+    def content_hash(self, source_path):
+        """Hash the source, reusing the previous result while its size and mtime are unchanged."""
+        return self.content_hashes([source_path])[0]
+
+    def content_hashes(self, source_paths):
+        """Hash several sources like content_hash, updating the index once for all of them."""
+        index = self._load_index()
+        hashes = []
+        changed = False
+        for source_path in source_paths:
+            source_path = os.path.abspath(source_path)
+            stat = os.stat(source_path)
+            entry = index.get(source_path)
+            if not entry or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+                entry = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': hash_file(source_path)}
+                index[source_path] = entry
+                changed = True
+            hashes.append(entry['sha256'])
+        if changed:
+            self._save_index(index)
+        return hashes
+
+    def path_for(self, source_path, content_hash=None):
+        content_hash = content_hash or self.content_hash(source_path)
+        return self.cache_dir / f"{content_hash[:32]}_{self.params_tag}.mp4"
+
+    def get(self, source_path):
+        """Return the normalized copy of a background, transcoding it on first use."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        cached_path = self.path_for(source_path)
+        lock_path = cached_path.with_name(f"{cached_path.stem}.lock")
+        while not cached_path.exists():
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                self._wait_for_lock(lock_path, cached_path)
+                continue
+            try:
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                if not cached_path.exists():
+                    self._normalize(source_path, cached_path)
+                    self.evict(keep=cached_path)
+                    return str(cached_path)
+            finally:
+                lock_path.unlink(missing_ok=True)
+        os.utime(cached_path)  # Mark as recently used
+        return str(cached_path)
+
+    def _wait_for_lock(self, lock_path, cached_path, poll_interval=0.2):
+        """Wait while another process transcodes cached_path, removing its lock if that process died."""
+        while lock_path.exists() and not cached_path.exists():
+            try:
+                owner = lock_path.read_text().strip()
+            except OSError:
+                return
+            # An empty lock was only just created, its owner is about to write its PID
+            if owner.isdigit() and not process_alive(int(owner)):
+                lock_path.unlink(missing_ok=True)
+                return
+            time.sleep(poll_interval)
+
+    def _normalize(self, source_path, cached_path):
+        # Transcode to a temporary name first, so parallel jobs never read a partial file
+        temp_path = cached_path.with_name(f"{cached_path.stem}.{os.getpid()}.tmp.mp4")
+        width, height = self.size
+        command = [
+            get_moviepy_setting("FFMPEG_BINARY"), '-y', '-loglevel', 'error',
+            '-i', source_path,
+            '-an',
+            '-vf', f"scale={width}:{height}:force_original_aspect_ratio=increase:"
+                   f"flags={FFMPEG_SCALING_FLAGS[self.scaling_mode]},crop={width}:{height},setsar=1,fps={self.fps}",
+            '-c:v', 'libx264',
+            '-preset', 'veryfast',
+            '-crf', str(self.crf),
+            '-g', str(self.gop),
+            '-bf', '0',
+            '-pix_fmt', 'yuv420p',
+            str(temp_path),
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"Failed to normalize {source_path}: {result.stderr.strip()[-2000:]}")
+            os.replace(temp_path, cached_path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+    def evict(self, keep=None):
+        """Remove the least recently used entries until the cache fits in max_size_mb."""
+        evict_lru(self.cache_dir, '*.mp4', self.max_size_mb, keep)
+
+def probe_video(path):
+    """Read a video's duration, display size, fps and codec from its headers with a single ffmpeg call."""
+    result = subprocess.run([get_moviepy_setting("FFMPEG_BINARY"), '-hide_banner', '-i', path],
+                            capture_output=True, text=True)
+    # ffmpeg exits with an error without an output file, the stream info is printed all the same
+    stream = re.search(r'Stream #.*?: Video: (\w+).*?, (\d{2,5})x(\d{2,5})[ ,].*?(?:([\d.]+) fps|([\d.]+) tbr)',
+                       result.stderr)
+    duration = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', result.stderr)
+    if not stream or not duration:
+        raise ValueError(f"No video stream found in {path}")
+    hours, minutes, seconds = duration.groups()
+    width, height = int(stream.group(2)), int(stream.group(3))
+    rotation = re.search(r'rotat(?:e\s*:\s*|ion of )(-?\d+)', result.stderr)
+    if rotation and abs(int(rotation.group(1))) % 180 == 90:
+        width, height = height, width
+    return {
+        'duration': int(hours) * 3600 + int(minutes) * 60 + float(seconds),
+        'width': width,
+        'height': height,
+        'fps': float(stream.group(4) or stream.group(5)),
+        'codec': stream.group(1),
+    }
+
+class BackgroundLibrary:
+    """Index of the background videos with their probed duration, size, fps, codec and content hash.
+
+    The index is kept in a JSON file and refreshed incrementally: only files whose
+    size or modification time changed are probed and hashed again. Hashes come from
+    the background cache when there is one, so each file is hashed once for both.
+    ``from_config`` shares one library per index within a process, and ``pick``
+    chooses from the loaded entries, refreshing them only when files are added,
+    removed or renamed in the video directory or a known file changed.
+    """
+
+    # Decoding and scaling cost of a background is measured against a 1080x1920, 30 fps clip
+    REFERENCE_PIXEL_RATE = 1080 * 1920 * 30
+    CHEAP_CODECS = ('h264',)
+
+    def __init__(self, video_dir='resources/background-videos', index_path='cache/background_library.json',
+                 background_cache=None):
+        self.video_dir = Path(video_dir)
+        self.index_path = Path(index_path)
+        self.background_cache = background_cache
+        self.entries = None
+        self._dir_mtime = None
+
+    @classmethod
+    def from_config(cls, config):
+        index_path = get_setting(config, 'background_library_index')
+        if index_path not in _background_libraries:
+            _background_libraries[index_path] = cls(index_path=index_path,
+                                                    background_cache=BackgroundCache.from_config(config))
+        return _background_libraries[index_path]
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        with open(temp_path, 'w') as f:
+            json.dump(index, f, indent=4)
+        os.replace(temp_path, self.index_path)
+
+    def _content_hashes(self, paths):
+        if self.background_cache is not None:
+            return self.background_cache.content_hashes(paths)
+        return [hash_file(path) for path in paths]
+
+    def _directory_mtime(self):
+        try:
+            return self.video_dir.stat().st_mtime
+        except OSError:
+            return None
+
+    def _is_stale(self):
+        """Whether the loaded entries no longer match the video directory."""
+        if self.entries is None or self._directory_mtime() != self._dir_mtime:
+            return True
+        # Overwriting a file in place leaves the directory's mtime alone
+        for path, entry in self.entries.items():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return True
+            if entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+                return True
+        return False
+
+    def refresh(self):
+        """Bring the index up to date with the video directory and return its usable entries by path."""
+        dir_mtime = self._directory_mtime()
+        index = self._load_index()
+        entries = {}
+        probed = []
+        for video_file in sorted(self.video_dir.glob('*.mp4')):
+            path = str(video_file)
+            stat = video_file.stat()
+            entry = index.get(path)
+            if not entry or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+                entry = {'size': stat.st_size, 'mtime': stat.st_mtime}
+                try:
+                    entry.update(probe_video(path))
+                    probed.append(path)
+                except ValueError as e:
+                    # Remembered, so a broken file is not probed again until it changes
+                    entry['error'] = str(e)
+                    console_print(f"{Colors.YELLOW}Skipping background {video_file.name}: {e}{Colors.RESET}")
+            entries[path] = entry
+        for path, content_hash in zip(probed, self._content_hashes(probed)):
+            entries[path]['sha256'] = content_hash
+        if entries != index:
+            self._save_index(entries)
+        self.entries = {path: entry for path, entry in entries.items() if 'error' not in entry}
+        self._dir_mtime = dir_mtime
+        return self.entries
+
+    def is_normalized(self, path, entry):
+        """Whether the background cache already holds a normalized copy of this background."""
+        return (self.background_cache is not None
+                and self.background_cache.path_for(path, entry['sha256']).exists())
+
+    def weight(self, path, entry, duration):
+        """Relative chance of picking a background for a video of the given duration.
+
+        Clips shorter than the video have to loop, and large, high frame rate or
+        non-H.264 clips are slow to decode and normalize, so both are picked less
+        often. None are excluded, to keep some variety.
+        """
+        weight = 1.0
+        if entry['duration'] < duration:
+            weight *= 0.2 * entry['duration'] / duration
+        if not self.is_normalized(path, entry):
+            pixel_rate = entry['width'] * entry['height'] * entry['fps']
+            weight /= max(1.0, pixel_rate / self.REFERENCE_PIXEL_RATE)
+            if entry['codec'] not in self.CHEAP_CODECS:
+                weight *= 0.5
+        return weight
+
+    def pick(self, duration=59):
+        """Weighted random choice of a background for a video of the given duration."""
+        if self._is_stale():
+            self.refresh()
+        entries = self.entries
+        if not entries:
+            raise Exception(f"No video files found in {self.video_dir}")
+        # Copies of the same file count once
+        unique = {entry['sha256']: (path, entry) for path, entry in entries.items()}
+        paths = [path for path, _ in unique.values()]
+        weights = [self.weight(path, entry, duration) for path, entry in unique.values()]
+        return random.choices(paths, weights)[0]
+
+# One BackgroundLibrary per index file, see BackgroundLibrary.from_config
+_background_libraries = {}
+
+def warm_background_cache():
+    """Normalize every background video ahead of time."""
+    config = load_settings()
+    cache = BackgroundCache.from_config(config) or BackgroundCache()
+    entries = BackgroundLibrary(index_path=get_setting(config, 'background_library_index'),
+                                background_cache=cache).refresh()
+    if not entries:
+        print(f"{Colors.YELLOW}No background videos found in resources/background-videos{Colors.RESET}")
+        return
+    for index, path in enumerate(entries, 1):
+        process_with_spinner(
+            f"Normalizing background {index}/{len(entries)}: {Path(path).name}...",
+            cache.get,
+            path
+        )
+    print(f"\n{Colors.GREEN}Background cache is ready in {cache.cache_dir}{Colors.RESET}")
+
+def get_random_background_video(audio_path=None, config=None):
+    """Pick a background from the library, preferring ones that fit the voiceover without looping."""
+    duration = min(probe_duration(audio_path), 59) if audio_path else 59
+    return BackgroundLibrary.from_config(config if config is not None else load_settings()).pick(duration)
+
+def print_script(title, description, prayer):
+    """Print the generated script."""
+    print(f"\n{Colors.BOLD}Title:{Colors.RESET} {title}")
+    print(f"{Colors.BOLD}Description:{Colors.RESET} {description}")
+    print(f"{Colors.BOLD}Prayer:{Colors.RESET}\n{prayer}\n")
+
+SCRIPT_MODEL = "claude-3-haiku-20240307"
+SCRIPT_TEMPERATURE = 0.7
+SCRIPT_SYSTEM_PROMPT = "You are a religious writer who writes in Spanish. For each prayer, provide three elements separated by '|||': 1) A short title (2-3 words), 2) A brief description (4-5 words), 3) The prayer text. Keep the prayer short, around 20 to 25 seconds of speech to ensure the final video stays under one minute."
+SCRIPT_PROMPT = "Write a short, inspiring religious prayer in Spanish that speaks about faith, hope, and divine guidance. Format: title ||| description ||| prayer"
+
+BATCH_SYSTEM_PROMPT = "You are a religious writer who writes in Spanish. Keep each prayer short, around 20 to 25 seconds of speech to ensure the final video stays under one minute. Every prayer in a response must be different from the others. Respond with only a JSON array and no other text."
+BATCH_PROMPT = "Write {count} different short, inspiring religious prayers in Spanish that speak about faith, hope, and divine guidance. Respond with a JSON array of {count} objects, each with the keys \"title\" (2-3 words), \"description\" (4-5 words) and \"prayer\" (the prayer text)."
+
+_client_lock = threading.Lock()
+_anthropic_clients = {}
+
+def get_anthropic_client(api_key, base_url=None):
+    """Return a shared Claude client, so its connection pool is reused across calls."""
+    with _client_lock:
+        client = _anthropic_clients.get((api_key, base_url))
+        if client is None:
+            client = anthropic.Anthropic(api_key=api_key, base_url=base_url)
+            _anthropic_clients[(api_key, base_url)] = client
+        return client
+
+def script_cache_key(seed):
+    """Cache key of the script generated for a seed with the current prompt and model."""
+    return ContentCache.make_key(
+        model=SCRIPT_MODEL,
+        temperature=SCRIPT_TEMPERATURE,
+        system=SCRIPT_SYSTEM_PROMPT,
+        prompt=SCRIPT_PROMPT,
+        seed=seed
+    )
+
+def batch_script_cache_key(seed, chunk_size):
+    """Cache key of a prayer from a ScriptBatch of the given chunk size with the current batch prompt and model."""
+    return ContentCache.make_key(
+        model=SCRIPT_MODEL,
+        temperature=SCRIPT_TEMPERATURE,
+        system=BATCH_SYSTEM_PROMPT,
+        prompt=BATCH_PROMPT,
+        chunk_size=chunk_size,
+        seed=seed
+    )
+
+def store_script(cache, title, description, prayer, seed=None, chunk_size=None):
+    """Save a script in the cache, under a random seed unless one is given.
+
+    With a chunk size the script is stored as one from a ScriptBatch, under the
+    batch prompt rather than the single script prompt.
+    """
+    seed = seed if seed is not None else uuid.uuid4().hex
+    key = script_cache_key(seed) if chunk_size is None else batch_script_cache_key(seed, chunk_size)
+    cache.put_json(key, {
+        'title': title,
+        'description': description,
+        'prayer': prayer,
+        'seed': seed,
+        'created': time.time(),
+    })
+
+def generate_script_from_claude(api_key, verbose=True, cache=None, seed=None, base_url=None):
+    """Generate script content using Claude API.
+
+    With a cache, a script already generated for the same prompt, model,
+    temperature and seed is reused. Scripts generated without a seed get a random
+    one, so they are still stored and can be re-rendered later.
+    """
+    if cache is not None and seed is not None:
+        cached = cache.get_json(script_cache_key(seed))
+        if cached is not None:
+            if verbose:
+                print_script(cached['title'], cached['description'], cached['prayer'])
+            return cached['title'], cached['description'], cached['prayer']
+    
+    client = get_anthropic_client(api_key, base_url)
     message = client.messages.create(
-        model="claude-3-haiku-20240307",
+        model=SCRIPT_MODEL,
         max_tokens=1000,
-        temperature=0.7,
-        system="You are a religious writer who writes in Spanish. For each prayer, provide three elements separated by '|||': 1) A short title (2-3 words), 2) A brief description (4-5 words), 3) The prayer text. Keep the prayer short, around 20 to 25 seconds of speech to ensure the final video stays under one minute.",
+        temperature=SCRIPT_TEMPERATURE,
+        system=SCRIPT_SYSTEM_PROMPT,
         messages=[
-            {"role": "user", "content": "Write a short, inspiring religious prayer in Spanish that speaks about faith, hope, and divine guidance. Format: title ||| description ||| prayer"}
+            {"role": "user", "content": SCRIPT_PROMPT}
         ]
     )
     
@@ -266,59 +1434,242 @@ def generate_script_from_claude(api_key):
         description = "Una oración de esperanza"
         prayer = content
     
-    print(f"\n{Colors.BOLD}Title:{Colors.RESET} {title}")
-    print(f"{Colors.BOLD}Description:{Colors.RESET} {description}")
-    print(f"{Colors.BOLD}Prayer:{Colors.RESET}\n{prayer}\n")
+    if cache is not None:
+        store_script(cache, title, description, prayer, seed)
+    
+    if verbose:
+        print_script(title, description, prayer)
         
     return title, description, prayer
 
-def create_voiceover(script, api_key):
-    """Generate voiceover using ElevenLabs API."""
+def parse_script_batch(content):
+    """Parse a JSON array of prayers from Claude, dropping entries that are incomplete."""
+    start, end = content.find('['), content.rfind(']')
+    if start == -1 or end < start:
+        raise ValueError("No JSON array found in Claude's response")
+    items = json.loads(content[start:end + 1])
+    if not isinstance(items, list):
+        raise ValueError("Expected a JSON array of prayers")
+    
+    scripts = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        fields = [item.get(key) for key in ('title', 'description', 'prayer')]
+        if all(isinstance(field, str) and field.strip() for field in fields):
+            scripts.append(tuple(field.strip() for field in fields))
+    return scripts
+
+class ScriptBatch:
+    """Prayers for a whole batch, requested from Claude a chunk at a time.
+
+    Each chunk is one Claude call returning several prayers as JSON. Prayers are
+    validated and deduplicated across the batch, and a chunk that fails to parse
+    or comes back short is retried on its own, without redoing the other chunks.
+    A chunk is fetched once: if it still falls short after its retries, the prayers
+    it did get are kept and only the videos left without one fail. Different chunks
+    can be fetched concurrently.
+    """
+
+    def __init__(self, api_key, count, chunk_size=5, cache=None, base_url=None, max_retries=2):
+        self.api_key = api_key
+        self.count = count
+        self.chunk_size = max(1, chunk_size)
+        self.cache = cache
+        self.base_url = base_url
+        self.max_retries = max_retries
+        chunk_count = (count + self.chunk_size - 1) // self.chunk_size
+        self._chunk_locks = [threading.Lock() for _ in range(chunk_count)]
+        self._chunks = {}
+        self._chunk_errors = {}
+        self._seen_lock = threading.Lock()
+        self._seen = set()
+
+    def get(self, index):
+        """Return the (title, description, prayer) for the video at index."""
+        chunk = index // self.chunk_size
+        with self._chunk_locks[chunk]:
+            if chunk not in self._chunks:
+                size = min(self.chunk_size, self.count - chunk * self.chunk_size)
+                self._chunks[chunk] = []
+                try:
+                    self._fetch_chunk(size, self._chunks[chunk])
+                except ValueError as e:
+                    self._chunk_errors[chunk] = str(e)
+        scripts = self._chunks[chunk]
+        if index % self.chunk_size < len(scripts):
+            return scripts[index % self.chunk_size]
+        raise ValueError(self._chunk_errors[chunk])
+
+    def _request(self, count):
+        message = get_anthropic_client(self.api_key, self.base_url).messages.create(
+            model=SCRIPT_MODEL,
+            max_tokens=min(4096, 600 * count),
+            temperature=SCRIPT_TEMPERATURE,
+            system=BATCH_SYSTEM_PROMPT,
+            messages=[
+                {"role": "user", "content": BATCH_PROMPT.format(count=count)}
+            ]
+        )
+        if not isinstance(message.content, list) or not message.content:
+            raise ValueError("Unexpected response structure from Claude API")
+        return parse_script_batch(message.content[0].text)
+
+    def _fetch_chunk(self, size, scripts):
+        """Add up to size new prayers to scripts, raising ValueError if some are still missing."""
+        last_error = None
+        for _ in range(self.max_retries + 1):
+            try:
+                candidates = self._request(size - len(scripts))
+            except (ValueError, anthropic.APIError) as e:
+                last_error = e
+                continue
+            for title, description, prayer in candidates:
+                # Normalize whitespace and case so near-identical prayers count as duplicates
+                fingerprint = ' '.join(prayer.casefold().split())
+                with self._seen_lock:
+                    if fingerprint in self._seen:
+                        continue
+                    self._seen.add(fingerprint)
+                scripts.append((title, description, prayer))
+                if self.cache is not None:
+                    store_script(self.cache, title, description, prayer, chunk_size=self.chunk_size)
+                if len(scripts) == size:
+                    return
+        raise ValueError(f"Claude returned {len(scripts)} of {size} usable prayers"
+                         + (f" (last error: {last_error})" if last_error else ""))
+
+VOICE_ID = "0rTCgryT71xGPrgtinaj"
+VOICE_MODEL = "eleven_multilingual_v2"
+VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.75
+}
+
+def voiceover_cache_key(script, voice_id=None):
+    """Cache key of the voiceover for a script with the given (or default) voice and the current model."""
+    return ContentCache.make_key(text=script, voice_id=voice_id or VOICE_ID, model=VOICE_MODEL,
+                                 voice_settings=VOICE_SETTINGS)
+
+def get_cached_voiceover(script, cache, temp_audio_path=None, voice_id=None):
+    """Copy a cached voiceover to a temp file, returning None when it isn't cached."""
+    cached_path = cache.get(voiceover_cache_key(script, voice_id))
+    if cached_path is None:
+        return None
+    # The render deletes its audio file afterwards, so it gets a copy
+    temp_audio_path = temp_audio_path or make_temp_audio_path()
+    shutil.copyfile(cached_path, temp_audio_path)
+    return temp_audio_path
+
+def make_temp_audio_path():
+    """Create a unique temp file for a voiceover, so concurrent jobs never share one."""
+    fd, temp_audio_path = tempfile.mkstemp(prefix='autoprayer_voiceover_', suffix='.mp3')
+    os.close(fd)
+    return temp_audio_path
+
+class VoiceoverClient:
+    """ElevenLabs text-to-speech over a pooled keep-alive session.
+
+    Audio is streamed to disk chunk by chunk instead of being buffered in memory,
+    and connection errors, connections dropped mid-stream, timeouts and 429/5xx
+    responses are retried with exponential backoff.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, api_key, base_url=None, pool_size=4, timeout=120, max_retries=3, backoff=1.0):
+        self.api_key = api_key
+        self.base_url = (base_url or "https://api.elevenlabs.io").rstrip('/')
+        self.timeout = (10, timeout)  # (connect, read)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            "Accept": "audio/mpeg",
+            "Content-Type": "application/json",
+            "xi-api-key": api_key
+        })
+
+    def synthesize(self, script, output_path, voice_id=None, chunk_size=64 * 1024):
+        """Stream the voiceover for a script into output_path."""
+        url = f"{self.base_url}/v1/text-to-speech/{voice_id or VOICE_ID}/stream"
+        data = {
+            "text": script,
+            "model_id": VOICE_MODEL,
+            "voice_settings": VOICE_SETTINGS
+        }
+        # Write next to the output and rename at the end, so a failed attempt never leaves a partial MP3
+        partial_path = f"{output_path}.part"
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.session.post(url, json=data, stream=True, timeout=self.timeout) as response:
+                    if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                        raise requests.HTTPError(f"{response.status_code} {response.reason}", response=response)
+                    response.raise_for_status()
+                    with open(partial_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size):
+                            f.write(chunk)
+                os.replace(partial_path, output_path)
+                return output_path
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                status = getattr(e.response, 'status_code', None)
+                if attempt == self.max_retries or (status is not None and status not in self.RETRY_STATUSES):
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+_voiceover_clients = {}
+
+def get_voiceover_client(api_key, base_url=None):
+    """Return a shared VoiceoverClient, so its connections stay open between voiceovers."""
+    with _client_lock:
+        client = _voiceover_clients.get((api_key, base_url))
+        if client is None:
+            client = VoiceoverClient(api_key, base_url)
+            _voiceover_clients[(api_key, base_url)] = client
+        return client
+
+def create_voiceover(script, api_key, temp_audio_path=None, cache=None, base_url=None, voice_id=None):
+    """Generate voiceover using ElevenLabs API.
+
+    The audio is written to temp_audio_path, or to a new unique temp file.
+    """
     if not isinstance(script, str):
         raise TypeError(f"Expected string script, got {type(script)}")
     
-    set_api_key(api_key)
+    if cache is not None:
+        cached_path = get_cached_voiceover(script, cache, temp_audio_path, voice_id)
+        if cached_path:
+            return cached_path
     
+    temp_audio_path = temp_audio_path or make_temp_audio_path()
+    _generate_voiceover(script, api_key, temp_audio_path, base_url, voice_id)
+    if cache is not None:
+        cache.put_file(voiceover_cache_key(script, voice_id), temp_audio_path)
+    return temp_audio_path
+
+def _generate_voiceover(script, api_key, temp_audio_path, base_url=None, voice_id=None):
     try:
-        # Simple approach for version 0.2.19
-        audio = generate(
-            text=script,
-            voice="0rTCgryT71xGPrgtinaj",  # Direct voice ID
-            model="eleven_multilingual_v2"
-        )
-        
-        temp_audio_path = "temp_voiceover.mp3"
-        save(audio, temp_audio_path)
-        return temp_audio_path
+        return get_voiceover_client(api_key, base_url).synthesize(script, temp_audio_path, voice_id)
     except Exception as e:
-        print(f"{Colors.YELLOW}First attempt failed, trying alternative method...{Colors.RESET}")
+        if base_url:
+            raise
+        print(f"{Colors.YELLOW}Streaming voiceover failed, trying the ElevenLabs SDK...{Colors.RESET}")
         try:
-            # Fallback to direct API call
-            import requests
-            
-            url = "https://api.elevenlabs.io/v1/text-to-speech/0rTCgryT71xGPrgtinaj"
-            
-            headers = {
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": api_key
-            }
-            
-            data = {
-                "text": script,
-                "model_id": "eleven_multilingual_v2",
-                "voice_settings": {
-                    "stability": 0.5,
-                    "similarity_boost": 0.75
-                }
-            }
-            
-            response = requests.post(url, json=data, headers=headers)
-            
-            temp_audio_path = "temp_voiceover.mp3"
-            with open(temp_audio_path, 'wb') as f:
-                f.write(response.content)
-            
+            # Fallback for version 0.2.19 of the SDK
+            elevenlabs.set_api_key(api_key)
+            audio = elevenlabs.generate(
+                text=script,
+                voice=voice_id or VOICE_ID,  # Direct voice ID
+                model=VOICE_MODEL
+            )
+            elevenlabs.save(audio, temp_audio_path)
             return temp_audio_path
         except Exception as e2:
             print(f"{Colors.RED}Both voiceover generation methods failed!{Colors.RESET}")
@@ -326,6 +1677,266 @@ def create_voiceover(script, api_key):
             print(f"{Colors.RED}Second error: {str(e2)}{Colors.RESET}")
             raise e2
 
+# Title and description styles, positioned from the top of the 1080x1920 frame
+TEXT_OVERLAYS = [
+    {'fontsize': 90, 'font': 'Arial-Bold', 'stroke_width': 2.5, 'y': 500},
+    {'fontsize': 55, 'font': 'Arial', 'stroke_width': 1.5, 'y': 800},
+]
+
+# Font files tried in order for each font name, PIL also searches the system font folders
+FONT_FILES = {
+    'Arial': ['arial.ttf', 'Arial.ttf', 'LiberationSans-Regular.ttf', 'DejaVuSans.ttf'],
+    'Arial-Bold': ['arialbd.ttf', 'Arial Bold.ttf', 'LiberationSans-Bold.ttf', 'DejaVuSans-Bold.ttf'],
+}
+
+@functools.lru_cache(maxsize=None)
+def load_font(font, fontsize):
+    """Load a TrueType font by name, falling back to PIL's built-in font."""
+    for font_file in FONT_FILES.get(font, [font]):
+        try:
+            return ImageFont.truetype(font_file, fontsize)
+        except OSError:
+            continue
+    return ImageFont.load_default(fontsize)
+
+def wrap_text(draw, text, font, max_width, stroke_width=0):
+    """Greedily wrap text into lines that fit within max_width pixels."""
+    lines = []
+    for paragraph in text.splitlines() or ['']:
+        line = ''
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and draw.textlength(candidate, font=font) + 2 * stroke_width > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return '\n'.join(lines)
+
+@functools.lru_cache(maxsize=64)
+def render_text_overlay(text, fontsize, font, stroke_width, width=1080):
+    """Rasterize centered, word-wrapped white text with a black outline to an RGBA array.
+
+    This draws the same caption as ImageMagick's ``TextClip(method='caption')`` in
+    process, and results are cached by text and style.
+    """
+    pil_font = load_font(font, fontsize)
+    stroke = int(round(stroke_width))
+    measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+    wrapped = wrap_text(measure, text, pil_font, width, stroke)
+    spacing = fontsize // 5
+    left, top, right, bottom = measure.multiline_textbbox(
+        (width / 2, 0), wrapped, font=pil_font, anchor='ma', align='center', spacing=spacing, stroke_width=stroke
+    )
+    
+    image = Image.new('RGBA', (width, int(math.ceil(bottom - min(top, 0))) + 1), (0, 0, 0, 0))
+    ImageDraw.Draw(image).multiline_text(
+        (width / 2, -min(top, 0)), wrapped, font=pil_font, anchor='ma', align='center', spacing=spacing,
+        fill='white', stroke_width=stroke, stroke_fill='black'
+    )
+    overlay = np.array(image)
+    overlay.flags.writeable = False  # Shared between videos through the cache
+    return overlay
+
+def create_text_overlays(title, description):
+    """Rasterize the title and description overlays with PIL."""
+    return [
+        render_text_overlay(text, style['fontsize'], style['font'], style['stroke_width'])
+        for text, style in zip((title, description), TEXT_OVERLAYS)
+    ]
+
+def overlay_from_clip(clip):
+    """Flatten a static clip and its mask into an RGBA array."""
+    rgb = clip.get_frame(0)
+    if clip.mask is None:
+        alpha = np.full(rgb.shape[:2], 255, dtype=np.uint8)
+    else:
+        alpha = np.round(clip.mask.get_frame(0) * 255).astype(np.uint8)
+    return np.dstack([rgb.astype(np.uint8), alpha])
+
+def create_text_clips(title, description, duration, text_renderer='pillow'):
+    """Create the title and description clips shown over the background."""
+    text_clips = []
+    if text_renderer == 'pillow':
+        for overlay, style in zip(create_text_overlays(title, description), TEXT_OVERLAYS):
+            # ImageClip turns the alpha channel into the clip's mask
+            clip = ImageClip(overlay).set_position(('center', style['y'])).set_duration(duration)
+            text_clips.append(clip)
+        return text_clips
+    
+    for text, style in zip((title, description), TEXT_OVERLAYS):
+        clip = TextClip(
+            text,
+            fontsize=style['fontsize'],
+            color='white',
+            font=style['font'],
+            stroke_color='black',
+            stroke_width=style['stroke_width'],
+            method='caption',
+            size=(1080, None),
+            align='center'
+        ).set_position(('center', style['y'])).set_duration(duration)
+        text_clips.append(clip)
+    return text_clips
+
+def probe_duration(path):
+    """Read a media file's duration from its headers without decoding it."""
+    return ffmpeg_parse_infos(path)['duration']
+
+def prepare_audio(audio_path, audio_cache=None, loudness=-14, job=None):
+    """Trim the voiceover to 59 seconds, normalize its loudness and encode it to AAC in one ffmpeg pass.
+
+    The result is muxed into the video without re-encoding. With a cache, it is keyed
+    by the voiceover's content and the settings, so a re-render skips the pass.
+    Returns the AAC path, its duration and whether it is a temporary file.
+    """
+    with metrics.stage('audio', job):
+        if probe_duration(audio_path) > 59:
+            console_print(f"{Colors.YELLOW}Audio exceeds 59 seconds, trimming...{Colors.RESET}")
+        key = None
+        if audio_cache is not None:
+            key = ContentCache.make_key(sha256=hash_file(audio_path), loudness=loudness, max_seconds=59,
+                                        bitrate=AUDIO_BITRATE_KBPS)
+            cached_path = audio_cache.get(key)
+            if cached_path is not None:
+                return str(cached_path), min(probe_duration(str(cached_path)), 59), False
+        
+        fd, temp_path = tempfile.mkstemp(prefix='autoprayer_audio_', suffix='.m4a')
+        os.close(fd)
+        command = [
+            get_moviepy_setting("FFMPEG_BINARY"), '-y', '-loglevel', 'error',
+            '-i', audio_path,
+            '-vn',
+            '-t', '59',
+        ]
+        if loudness is not None:
+            # Single-pass loudnorm streams the audio instead of measuring the whole file first
+            command += ['-af', f'loudnorm=I={loudness}:TP=-1.5:LRA=11']
+        command += ['-ar', '44100', '-c:a', 'aac', '-b:a', f'{AUDIO_BITRATE_KBPS}k', temp_path]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            os.remove(temp_path)
+            raise RuntimeError(f"Failed to prepare audio {audio_path}: {result.stderr.strip()[-2000:]}")
+        if key is None:
+            return temp_path, min(probe_duration(temp_path), 59), True
+        cached_path = str(audio_cache.put_file(key, temp_path))
+        os.remove(temp_path)
+        return cached_path, min(probe_duration(cached_path), 59), False
+
+# ffmpeg scaler names for each scaling mode
+FFMPEG_SCALING_FLAGS = {
+    'lanczos': 'lanczos',
+    'bilinear': 'bilinear',
+    'area': 'area',
+}
+
+def build_ffmpeg_render_command(background_video_path, audio_path, overlay_paths, output_path, duration,
+                                threads=4, scaling_mode='lanczos', loop=True, encode_profile=None,
+                                pass_number=None, passlog=None):
+    """Build a single ffmpeg command that renders the whole video.
+
+    ffmpeg scales and crops the background to 1080x1920, loops it when needed,
+    trims to the audio length, overlays the text images and muxes the audio, so no
+    frame ever passes through Python. For two-pass profiles, pass 1 only writes the
+    x264 stats to passlog.
+    """
+    encode_profile = get_encode_profile(encode_profile or 'standard')
+    command = [get_moviepy_setting("FFMPEG_BINARY"), '-y', '-loglevel', 'error', '-nostats', '-progress', 'pipe:1']
+    if loop:
+        command += ['-stream_loop', '-1']
+    command += ['-i', background_video_path, '-i', audio_path]
+    for overlay_path in overlay_paths:
+        command += ['-i', overlay_path]
+    
+    filters = [
+        f"[0:v]scale=1080:1920:force_original_aspect_ratio=increase:flags={FFMPEG_SCALING_FLAGS[scaling_mode]},"
+        f"crop=1080:1920,setsar=1,fps=30[v0]"
+    ]
+    for index, style in enumerate(TEXT_OVERLAYS[:len(overlay_paths)]):
+        filters.append(f"[v{index}][{index + 2}:v]overlay=x=(W-w)/2:y={style['y']}[v{index + 1}]")
+    filters.append(f"[v{len(overlay_paths)}]format=yuv420p[out]")
+    
+    command += [
+        '-filter_complex', ';'.join(filters),
+        '-map', '[out]',
+    ]
+    if pass_number != 1:
+        command += ['-map', '1:a']
+    command += [
+        '-t', f"{duration:.3f}",
+        '-r', '30',
+        '-c:v', 'libx264',
+        '-preset', encode_profile['preset'],
+        *video_rate_args(encode_profile, duration),
+        '-profile:v', 'main',
+        '-level', '4.0',
+        '-threads', str(threads),
+    ]
+    if pass_number:
+        command += ['-pass', str(pass_number), '-passlogfile', passlog]
+    if pass_number == 1:
+        command += ['-an', '-f', 'null', os.devnull]
+    else:
+        # The audio was encoded once by prepare_audio
+        command += ['-c:a', 'copy', output_path]
+    return command
+
+def run_ffmpeg(command, total_frames=None, logger=None):
+    """Run an ffmpeg command, forwarding its -progress output to a MoviePy-style logger."""
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if logger is not None and total_frames:
+        logger(t__total=total_frames)
+    for line in process.stdout:
+        key, _, value = line.strip().partition('=')
+        if key == 'frame' and logger is not None and total_frames:
+            logger(t__index=min(int(value), total_frames))
+    stderr = process.stderr.read()
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed with exit code {process.returncode}: {stderr.strip()[-2000:]}")
+
+def render_with_ffmpeg(background_video_path, audio_path, title, description, output_path,
+                       threads=4, logger=None, scaling_mode='lanczos', text_renderer='pillow', job=None,
+                       encode_profile=None):
+    """Render the final video with one ffmpeg filter graph instead of MoviePy's frame loop."""
+    temp_dir = tempfile.mkdtemp(prefix='autoprayer_')
+    text_clips = []
+    try:
+        duration = min(probe_duration(audio_path), 59)
+        background_duration = probe_duration(background_video_path)
+        
+        console_print("Adding text overlays...")
+        overlay_paths = [os.path.join(temp_dir, f"overlay_{index}.png") for index in range(len(TEXT_OVERLAYS))]
+        if text_renderer == 'pillow':
+            for overlay, overlay_path in zip(create_text_overlays(title, description), overlay_paths):
+                Image.fromarray(overlay, 'RGBA').save(overlay_path)
+        else:
+            text_clips = create_text_clips(title, description, duration, text_renderer)
+            for clip, overlay_path in zip(text_clips, overlay_paths):
+                clip.save_frame(overlay_path, t=0, withmask=True)
+        
+        encode_profile = get_encode_profile(encode_profile or 'standard')
+        command_args = dict(threads=threads, scaling_mode=scaling_mode, loop=background_duration < duration,
+                            encode_profile=encode_profile)
+        total_frames = int(math.ceil(duration * 30))
+        with metrics.stage('encode', job, total_frames, output_path, profile=encode_profile['name']):
+            if is_two_pass(encode_profile):
+                command_args.update(pass_number=2, passlog=os.path.join(temp_dir, 'x264'))
+                console_print("\nAnalyzing video (first pass)...")
+                run_ffmpeg(build_ffmpeg_render_command(
+                    background_video_path, audio_path, overlay_paths, output_path, duration,
+                    **dict(command_args, pass_number=1)
+                ), total_frames, logger or CustomLogger())
+            console_print("\nGenerating final video...")
+            run_ffmpeg(build_ffmpeg_render_command(
+                background_video_path, audio_path, overlay_paths, output_path, duration, **command_args
+            ), total_frames, logger or CustomLogger())
+        return output_path
+    finally:
+        for text_clip in text_clips:
+            text_clip.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
 def safe_close(clip):
     """Safely close a MoviePy clip."""
     try:
@@ -333,6 +1944,10 @@ def safe_close(clip):
             try:
                 if hasattr(clip.reader, 'proc') and clip.reader.proc is not None:
                     clip.reader.proc.terminate()
+                    # Close the pipes first, ffmpeg can't exit while blocked writing a full pipe
+                    for pipe in (clip.reader.proc.stdout, clip.reader.proc.stderr):
+                        if pipe is not None:
+                            pipe.close()
                     clip.reader.proc.wait()
                     clip.reader.proc = None
             except Exception:
@@ -342,187 +1957,1152 @@ def safe_close(clip):
     except Exception:
         pass
 
-def create_final_video(background_video_path, audio_path, title, description, output_path="output_video.mp4"):
-    """Create the final video with background and voiceover."""
-    output_dir = Path('output')
-    output_dir.mkdir(exist_ok=True)
-    
-    output_path = str(output_dir / output_path)
-    
-    background = None
-    audio = None
-    final_video = None
-    text_clips = []
-    clips_to_close = []
+def build_video_clip(background_video_path, duration, title, description, job=None, scaling_mode='lanczos',
+                     text_renderer='pillow', loop_cache_mb=1024, loop_spill_mb=8192, clips_to_close=None,
+                     flush_frame_metrics=None):
+    """Build the silent 1080x1920 clip of the final video: the scaled background, looped or
+    trimmed to duration, with the text overlays.
+
+    Only clips that hold a decoder or frame memory are appended to clips_to_close, and
+    frame metric flushers to flush_frame_metrics, for the caller to close and flush once
+    the clip has been written. Clips derived from them are freed along with the result.
+    """
+    clips_to_close = clips_to_close if clips_to_close is not None else []
+    flush_frame_metrics = flush_frame_metrics if flush_frame_metrics is not None else []
     
-    try:
-        background = process_with_spinner(
+    with metrics.stage('load', job):
+        # The background's own audio is never used, so don't start a decoder for it
+        source = process_with_spinner(
             "Loading background video...",
             VideoFileClip,
-            background_video_path
+            background_video_path,
+            audio=False
         )
-        clips_to_close.append(background)
-        
-        target_height = 1920
-        aspect_ratio = background.w / background.h
-        new_width = int(target_height * aspect_ratio)
-        new_width = new_width + (new_width % 2)
-        
-        def process_frame(frame):
-            resized = resize_frame(frame, (new_width, target_height))
-            center = resized.shape[1] // 2
-            start_x = center - 540  # 1080/2 = 540
-            cropped = resized[:, start_x:start_x + 1080]
-            return cropped
+    clips_to_close.append(source)
+    FrameBufferPool.attach(source)
+    background = source
+    
+    # Normalized backgrounds from the cache are already the right size
+    if tuple(background.size) != (1080, 1920):
+        process_frame, flush = metrics.wrap_frames(
+            'process_frame', job, FrameScaler(background.size, (1080, 1920), scaling_mode)
+        )
+        flush_frame_metrics.append(flush)
         
         background = process_with_spinner(
             "Processing video frames...",
             background.fl_image,
             process_frame
         )
-        clips_to_close.append(background)
-        
-        audio = process_with_spinner(
-            "Loading audio...",
-            AudioFileClip,
-            audio_path
+    
+    loop_cache = None
+    if background.duration < duration:
+        # The decoder is closed as soon as every frame of the loop is cached
+        loop_cache = LoopFrameCache.create(background, loop_cache_mb, loop_spill_mb, release=source.close)
+    if loop_cache is not None:
+        # Each source frame is decoded and scaled once, then replayed for every loop
+        clips_to_close.append(loop_cache)
+        background = process_with_spinner(
+            "Adjusting video length...",
+            loop_cache.looped_clip,
+            duration
         )
-        clips_to_close.append(audio)
-        
-        if audio.duration > 59:
-            print(f"{Colors.YELLOW}Audio exceeds 59 seconds, trimming...{Colors.RESET}")
-            audio = audio.subclip(0, 59)
-            clips_to_close.append(audio)
-        
-        if background.duration < audio.duration:
-            loops_needed = int(np.ceil(audio.duration / background.duration))
-            clips = [background] * loops_needed
-            background = process_with_spinner(
-                "Adjusting video length...",
-                concatenate_videoclips,
-                clips
-            )
-            clips_to_close.append(background)
-            background = background.subclip(0, audio.duration)
-            clips_to_close.append(background)
-        elif background.duration > audio.duration:
-            background = process_with_spinner(
-                "Trimming video...",
-                background.subclip,
-                0, audio.duration
-            )
-            clips_to_close.append(background)
+    elif background.duration < duration:
+        loops_needed = int(np.ceil(duration / background.duration))
+        clips = [background] * loops_needed
+        background = process_with_spinner(
+            "Adjusting video length...",
+            concatenate_videoclips,
+            clips
+        )
+        background = background.subclip(0, duration)
+    elif background.duration > duration:
+        background = process_with_spinner(
+            "Trimming video...",
+            background.subclip,
+            0, duration
+        )
+    
+    console_print("Adding text overlays...")
+    if text_renderer == 'pillow':
+        overlays = create_text_overlays(title, description)
+    else:
+        overlays = []
+        # Only the rendered pixels are kept, the ImageMagick clips are closed right away
+        for text_clip in create_text_clips(title, description, background.duration, text_renderer):
+            overlays.append(overlay_from_clip(text_clip))
+            text_clip.close()
+    compositor, flush = metrics.wrap_frames('composite', job, StaticOverlayCompositor(
+        [(overlay, ('center', style['y'])) for overlay, style in zip(overlays, TEXT_OVERLAYS)]
+    ))
+    flush_frame_metrics.append(flush)
+    return background.fl_image(compositor)
+
+def close_render_resources(clips_to_close, flush_frame_metrics):
+    for flush in flush_frame_metrics:
+        flush()
+    for clip in clips_to_close:
+        safe_close(clip)
+
+def create_final_video(background_video_path, audio_path, title, description, output_path="output_video.mp4",
+                       threads=None, logger=None, scaling_mode='lanczos', backend='moviepy', background_cache=None,
+                       text_renderer='pillow', loop_cache_mb=1024, loop_spill_mb=8192, job=None,
+                       encode_profile='standard', preset=None, segments=1, segment_gop=60, memory_mb=None,
+                       audio_cache=None, loudness=-14):
+    """Create the final video with background and voiceover.
+
+    encode_profile is a name from ENCODE_PROFILES or resolved profile settings,
+    and preset overrides its x264 preset. With segments > 1 the MoviePy backend
+    renders the video in that many processes, see render_segmented. memory_mb
+    budgets the render: the in-memory loop cache gets at most half of it, and
+    segments are limited to as many as fit in the free memory. The voiceover is
+    trimmed, normalized to the loudness target and encoded once by prepare_audio.
+    """
+    encode_profile = get_encode_profile(encode_profile)
+    if preset:
+        encode_profile = dict(encode_profile, preset=preset)
+    if memory_mb:
+        # Leave the other half for decoding, scaling and compositing; the rest of the loop spills to disk
+        loop_cache_mb = min(loop_cache_mb, memory_mb / 2)
+        if segments > 1:
+            segments = min(segments, fitting_jobs(memory_mb, segments))
+    threads = threads or available_cores()
+    output_dir = Path('output')
+    output_dir.mkdir(exist_ok=True)
+    job = job or Path(output_path).stem
+    output_path = str(output_dir / output_path)
+    
+    if backend not in ('moviepy', 'ffmpeg'):
+        raise ValueError(f"Unknown render backend '{backend}', expected 'moviepy' or 'ffmpeg'")
+    
+    prepared_audio = None
+    clips_to_close = []
+    flush_frame_metrics = []
+    passlog_dir = None
+    
+    try:
+        if background_cache is not None:
+            with metrics.stage('background_cache', job):
+                background_video_path = process_with_spinner(
+                    "Preparing background video...",
+                    background_cache.get,
+                    background_video_path
+                )
         
-        print("Adding text overlays...")
-        title_clip = TextClip(
-            title,
-            fontsize=90,
-            color='white',
-            font='Arial-Bold',
-            stroke_color='black',
-            stroke_width=2.5,
-            method='caption',
-            size=(1080, None),
-            align='center'
-        ).set_position(('center', 500)).set_duration(background.duration)
-        text_clips.append(title_clip)
+        prepared_audio, duration, temporary_audio = prepare_audio(audio_path, audio_cache, loudness, job)
         
-        desc_clip = TextClip(
-            description,
-            fontsize=55,
-            color='white',
-            font='Arial',
-            stroke_color='black',
-            stroke_width=1.5,
-            method='caption',
-            size=(1080, None),
-            align='center'
-        ).set_position(('center', 800)).set_duration(background.duration)
-        text_clips.append(desc_clip)
+        if backend == 'ffmpeg':
+            return render_with_ffmpeg(background_video_path, prepared_audio, title, description, output_path,
+                                      threads=threads, logger=logger, scaling_mode=scaling_mode,
+                                      text_renderer=text_renderer, job=job, encode_profile=encode_profile)
         
-        final_video = process_with_spinner(
-            "Combining video and audio...",
-            background.set_audio,
-            audio
-        )
-        clips_to_close.append(final_video)
+        clip_options = dict(job=job, scaling_mode=scaling_mode, text_renderer=text_renderer,
+                            loop_cache_mb=loop_cache_mb, loop_spill_mb=loop_spill_mb)
+        if segments > 1:
+            return render_segmented(background_video_path, prepared_audio, title, description, output_path,
+                                    segments, segment_gop, encode_profile, threads, logger, clip_options)
         
-        final_video = CompositeVideoClip([final_video] + text_clips)
-        clips_to_close.append(final_video)
+        final_video = build_video_clip(background_video_path, duration, title, description,
+                                       clips_to_close=clips_to_close, flush_frame_metrics=flush_frame_metrics,
+                                       **clip_options)
         
-        print("\nGenerating final video...")
-        final_video.write_videofile(
-            output_path,
+        write_options = dict(
             codec='libx264',
-            audio_codec='aac',
             fps=30,
-            preset='medium',
-            bitrate='8000k',
-            audio_bitrate='192k',
-            threads=4,
-            ffmpeg_params=[
-                '-pix_fmt', 'yuv420p',
-                '-profile:v', 'main', 
-                '-level', '4.0'         # Compatibility level
-            ],
-            logger=CustomLogger() 
+            preset=encode_profile['preset'],
+            threads=threads,
+            logger=logger or CustomLogger()
         )
+        ffmpeg_params = video_rate_args(encode_profile, final_video.duration) + X264_OUTPUT_PARAMS
+        # The encode stage covers the whole frame loop, process_frame and composite are the parts spent in Python
+        encode_stage = metrics.stage('encode', job, int(final_video.duration * 30), output_path,
+                                     profile=encode_profile['name'])
+        with encode_stage, metrics.profile(job):
+            if is_two_pass(encode_profile):
+                passlog_dir = tempfile.mkdtemp(prefix='autoprayer_pass_')
+                passlog = os.path.join(passlog_dir, 'x264')
+                console_print("\nAnalyzing video (first pass)...")
+                final_video.write_videofile(
+                    os.devnull,
+                    audio=False,
+                    ffmpeg_params=ffmpeg_params + ['-pass', '1', '-passlogfile', passlog, '-f', 'null'],
+                    **write_options
+                )
+                ffmpeg_params += ['-pass', '2', '-passlogfile', passlog]
+            console_print("\nGenerating final video...")
+            # Given a file, MoviePy muxes the prepared AAC with -acodec copy instead of re-encoding it
+            final_video.write_videofile(
+                output_path,
+                audio=prepared_audio,
+                ffmpeg_params=ffmpeg_params,
+                **write_options
+            )
+        return output_path
         
     finally:
-        for clip in clips_to_close:
-            safe_close(clip)
-        for text_clip in text_clips:
-            text_clip.close()
-        if os.path.exists(audio_path):
+        if passlog_dir:
+            shutil.rmtree(passlog_dir, ignore_errors=True)
+        close_render_resources(clips_to_close, flush_frame_metrics)
+        temporary_paths = [audio_path]
+        if prepared_audio and temporary_audio:
+            temporary_paths.append(prepared_audio)
+        for path in temporary_paths:
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except Exception:
+                    pass
+
+def plan_segments(total_frames, segments, gop):
+    """Split frames [0, total_frames) into up to `segments` ranges starting on multiples of gop."""
+    gops = math.ceil(total_frames / gop)
+    segments = max(1, min(segments, gops))
+    bounds = [min(total_frames, round(gops * index / segments) * gop) for index in range(segments + 1)]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def _render_segment(index, start_frame, end_frame, segment_path, duration, background_video_path, title,
+                    description, encode_profile, threads, gop, progress_queue, clip_options):
+    """Encode frames [start_frame, end_frame) of the final video, without audio, in a worker process.
+
+    Frames are taken at the same times MoviePy's write_videofile uses, so the
+    segments put together hold exactly the frames of a serial render.
+    """
+    # Segment workers are reused, report this segment's peak rather than the process's
+    reset_peak_rss()
+    clips_to_close, flush_frame_metrics = [], []
+    passlog_dir = tempfile.mkdtemp(prefix='autoprayer_pass_')
+    try:
+        video = build_video_clip(background_video_path, duration, title, description,
+                                 clips_to_close=clips_to_close, flush_frame_metrics=flush_frame_metrics, **clip_options)
+        ffmpeg_params = video_rate_args(encode_profile, duration) + X264_OUTPUT_PARAMS + [
+            # Fixed GOPs, so the segments join without re-encoding at the same keyframe spacing
+            '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0',
+        ]
+        passes = [(segment_path, ffmpeg_params)]
+        if is_two_pass(encode_profile):
+            passlog = os.path.join(passlog_dir, 'x264')
+            passes = [
+                (os.devnull, ffmpeg_params + ['-pass', '1', '-passlogfile', passlog, '-f', 'null']),
+                (segment_path, ffmpeg_params + ['-pass', '2', '-passlogfile', passlog]),
+            ]
+        step = 1.0 / 30  # Same times as np.arange(0, duration, 1 / fps) in MoviePy's iter_frames
+        with metrics.stage('encode_segment', clip_options.get('job'), end_frame - start_frame, segment_path):
+            for pass_number, (path, params) in enumerate(passes, 1):
+                writer = FFMPEG_VideoWriter(path, video.size, 30, codec='libx264', preset=encode_profile['preset'],
+                                            threads=threads, ffmpeg_params=params)
+                try:
+                    for frame_index in range(start_frame, end_frame):
+                        writer.write_frame(video.get_frame(frame_index * step))
+                        if pass_number == len(passes) and (frame_index - start_frame) % 10 == 9:
+                            progress_queue.put((index, frame_index - start_frame + 1))
+                finally:
+                    writer.close()
+        progress_queue.put((index, end_frame - start_frame))
+    finally:
+        shutil.rmtree(passlog_dir, ignore_errors=True)
+        close_render_resources(clips_to_close, flush_frame_metrics)
+    return metrics.drain()
+
+def render_segmented(background_video_path, audio_path, title, description, output_path, segments, gop,
+                     encode_profile, threads, logger, clip_options):
+    """Render one video as several segments in parallel processes, then join them.
+
+    The timeline is split on GOP boundaries, each process builds the same clip and
+    encodes its own range of frames, and ffmpeg's concat demuxer joins the segments
+    and muxes the prepared audio, all without re-encoding.
+    """
+    job = clip_options.get('job')
+    duration = min(probe_duration(audio_path), 59)
+    total_frames = len(np.arange(0, duration, 1.0 / 30))
+    plan = plan_segments(total_frames, segments, gop)
+    temp_dir = tempfile.mkdtemp(prefix='autoprayer_segments_')
+    logger = logger or CustomLogger()
+    try:
+        segment_paths = [os.path.join(temp_dir, f"segment_{index:03d}.mp4") for index in range(len(plan))]
+        console_print(f"\nGenerating final video in {len(plan)} segments...")
+        with metrics.stage('encode', job, total_frames, output_path, profile=encode_profile['name']), \
+                multiprocessing.Manager() as manager, \
+                ProcessPoolExecutor(len(plan), initializer=_init_render_worker,
+                                    initargs=(metrics.enabled, str(metrics.report_dir), metrics.profiler)) as pool:
+            progress_queue = manager.Queue()
+            futures = [
+                pool.submit(_render_segment, index, start, end, segment_paths[index], duration,
+                            background_video_path, title, description, encode_profile,
+                            max(1, threads // len(plan)), gop, progress_queue, clip_options)
+                for index, (start, end) in enumerate(plan)
+            ]
+            logger(t__total=total_frames)
+            done = [0] * len(plan)
+            while not all(future.done() for future in futures) or not progress_queue.empty():
+                try:
+                    index, frames = progress_queue.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                done[index] = frames
+                logger(t__index=sum(done))
+            for future in futures:
+                metrics.extend(future.result())
+        
+        list_path = os.path.join(temp_dir, 'segments.txt')
+        with open(list_path, 'w') as f:
+            f.writelines(f"file '{Path(path).as_posix()}'\n" for path in segment_paths)
+        with metrics.stage('concat', job, total_frames, output_path):
+            result = subprocess.run([
+                get_moviepy_setting("FFMPEG_BINARY"), '-y', '-loglevel', 'error',
+                '-f', 'concat', '-safe', '0', '-i', list_path,
+                '-i', audio_path,
+                '-map', '0:v', '-map', '1:a',
+                '-t', f"{duration:.3f}",
+                '-c:v', 'copy',
+                '-c:a', 'copy',
+                output_path,
+            ], capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to join video segments: {result.stderr.strip()[-2000:]}")
+        return output_path
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def fitting_jobs(memory_mb, jobs):
+    """How many of up to `jobs` renders with a budget of memory_mb each fit in the free memory, at least one."""
+    available = available_memory_mb()
+    if not memory_mb or available is None:
+        return jobs
+    return max(1, min(jobs, int(available // memory_mb)))
+
+RenderResult = namedtuple('RenderResult', ['job_id', 'output_path', 'error', 'metrics'])
+
+def _init_render_worker(metrics_enabled=False, metrics_dir='reports', profiler=None, ignore_interrupts=False):
+    global _quiet
+    _quiet = True
+    metrics.configure(metrics_enabled, metrics_dir, profiler)
+    # Forked workers start with a copy of the parent's records and peak memory, which aren't theirs
+    metrics.drain()
+    reset_peak_rss()
+    if ignore_interrupts:
+        # Ctrl+C reaches the whole process group, let the parent decide what to stop
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def _render_job(job_id, progress_queue, threads, args, kwargs):
+    """Render a single video inside a worker process, capturing any failure."""
+    # Workers stay up for many jobs, so start each one's peak from the memory in use now
+    reset_peak_rss()
+    try:
+        logger = QueueProgressLogger(job_id, progress_queue)
+        output_path = create_final_video(*args, threads=threads, logger=logger, **kwargs)
+        return RenderResult(job_id, output_path, None, metrics.drain())
+    except Exception:
+        return RenderResult(job_id, None, traceback.format_exc(), metrics.drain())
+    finally:
+        progress_queue.put((job_id, None, None))
+
+class RenderScheduler:
+    """Render several videos at once in separate worker processes.
+
+    The encoder thread budget is split evenly so each job gets
+    ``total_threads // workers`` ffmpeg threads, and progress from all jobs is
+    merged into a single progress bar. A failing job is reported in
+    ``results`` without affecting the others.
+
+    Long-running callers pass ``keep_results=False`` and handle each job through
+    the future returned by ``submit`` instead, so finished jobs aren't kept around.
+    
+    With a per-job ``memory_mb`` budget, only as many workers start as fit in the
+    free memory, and a new job waits while others run and less than its budget is
+    free, so parallel renders slow down instead of running out of memory.
+    """
+
+    def __init__(self, workers, total_threads=None, keep_results=True, ignore_interrupts=False, memory_mb=None):
+        self.workers = fitting_jobs(memory_mb, max(1, int(workers)))
+        if self.workers < int(workers):
+            console_print(f"{Colors.YELLOW}Free memory fits {self.workers} of {workers} render workers "
+                          f"at {memory_mb} MB each.{Colors.RESET}")
+        self.memory_mb = memory_mb
+        self.keep_results = keep_results
+        self.ignore_interrupts = ignore_interrupts
+        total_threads = total_threads or available_cores()
+        self.threads_per_job = max(1, int(total_threads) // self.workers)
+        self.results = []
+        self._jobs = []
+        self._slots = threading.Semaphore(self.workers)
+        self._lock = threading.Lock()
+        self._progress = {}
+        self._finished = 0
+
+    def __enter__(self):
+        self._manager = multiprocessing.Manager()
+        self._queue = self._manager.Queue()
+        self._executor = ProcessPoolExecutor(
+            self.workers,
+            initializer=_init_render_worker,
+            initargs=(metrics.enabled, str(metrics.report_dir), metrics.profiler, self.ignore_interrupts)
+        )
+        self._monitor = threading.Thread(target=self._watch_progress, daemon=True)
+        self._monitor.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        try:
+            for job_id, future in self._jobs:
+                try:
+                    result = future.result()
+                    metrics.extend(result.metrics)
+                    self.results.append(result)
+                except Exception as e:
+                    # The worker process itself died (e.g. out of memory)
+                    self.results.append(RenderResult(job_id, None, f"{type(e).__name__}: {e}", []))
+        finally:
+            self._executor.shutdown(wait=True)
+            self._queue.put(None)
+            self._monitor.join()
+            self._manager.shutdown()
+            sys.stdout.write('\n')
+            sys.stdout.flush()
+        return False
+
+    def submit(self, job_id, *args, **kwargs):
+        """Queue a create_final_video job, blocking while all workers are busy."""
+        self._slots.acquire()
+        self._wait_for_memory()
+        with self._lock:
+            self._progress[job_id] = 0.0
+        future = self._executor.submit(_render_job, job_id, self._queue, self.threads_per_job, args, kwargs)
+        future.add_done_callback(lambda f: self._slots.release())
+        if self.keep_results:
+            self._jobs.append((job_id, future))
+        return future
+
+    def _wait_for_memory(self):
+        if not self.memory_mb:
+            return
+        while True:
+            with self._lock:
+                running = len(self._progress)
+            available = available_memory_mb()
+            if not running or available is None or available >= self.memory_mb:
+                return
+            time.sleep(0.5)
+
+    def print(self, message):
+        """Print a message without garbling the progress bar."""
+        with self._lock:
+            sys.stdout.write('\r' + ' ' * 80 + '\r')
+            print(message)
+            self._draw()
+
+    def _watch_progress(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            job_id, value, total = item
+            with self._lock:
+                if value is None:
+                    self._progress.pop(job_id, None)
+                    self._finished += 1
+                else:
+                    self._progress[job_id] = value / total if total else 0.0
+                self._draw()
+
+    def _draw(self):
+        submitted = self._finished + len(self._progress)
+        if not submitted:
+            return
+        percentage = int((self._finished + sum(self._progress.values())) / submitted * 100)
+        bar_width = 40
+        filled = int(bar_width * percentage / 100)
+        bar = f'{Colors.BLUE}█{Colors.RESET}' * filled + '░' * (bar_width - filled)
+        sys.stdout.write(
+            f'\r{Colors.BOLD}Rendering videos:{Colors.RESET} |{bar}| {Colors.BLUE}{percentage}%{Colors.RESET}'
+            f' ({len(self._progress)} active, {self._finished}/{submitted} done)'
+        )
+        sys.stdout.flush()
+
+def find_cached_videos(config):
+    """Cached scripts whose voiceover is cached too, most recent first."""
+    script_cache, voiceover_cache = create_content_caches(config)
+    if script_cache is None:
+        return []
+    videos = []
+    for path in script_cache.entries():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                script = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if voiceover_cache.path_for(voiceover_cache_key(script['prayer'])).exists():
+            videos.append(script)
+    return videos
+
+PreparedVideo = namedtuple('PreparedVideo', ['video_num', 'title', 'description', 'prayer', 'audio_path'])
+
+class BatchPipeline:
+    """Prepare scripts and voiceovers for upcoming videos while the current one renders.
+
+    Script generation and voiceover creation run on their own thread pools, so the
+    network calls for videos N+1..N+prefetch overlap with the render of video N.
+    At most ``prefetch + 1`` videos are in flight at once, which bounds both the
+    API usage and the number of temporary audio files on disk.
+
+    ``jobs`` gives each video its own text and voice (see load_jobs); only videos
+    without a prayer are sent to Claude. With ``on_error``, a video whose script or
+    voiceover fails is reported to ``on_error(video_num, error)`` and skipped
+    instead of stopping the batch. ``labels`` names each video in the run metrics,
+    so callers can give its script and voiceover stages the label of its render.
+    """
+
+    def __init__(self, config, num_videos, replay=None, jobs=None, on_error=None, labels=None):
+        self.config = config
+        self.num_videos = num_videos
+        self.script_workers = max(1, int(get_setting(config, 'script_workers')))
+        self.voiceover_workers = max(1, int(get_setting(config, 'voiceover_workers')))
+        self.prefetch = max(0, int(get_setting(config, 'prefetch')))
+        self.script_cache, self.voiceover_cache = create_content_caches(config)
+        # Cached scripts to re-render without calling any API, see find_cached_videos
+        self.replay = replay
+        self.jobs = jobs
+        self.on_error = on_error
+        self.labels = labels or [f"video_{video_num + 1}" for video_num in range(num_videos)]
+        # Position of each video that needs a generated script within the script batch
+        generated = [video_num for video_num in range(num_videos) if not (jobs and jobs[video_num].get('prayer'))]
+        self._batch_index = {video_num: index for index, video_num in enumerate(generated)}
+        self.script_batch = None
+        batch_size = int(get_setting(config, 'script_batch_size'))
+        if replay is None and batch_size > 1 and len(generated) > 1:
+            self.script_batch = ScriptBatch(
+                config['anthropic_api_key'],
+                len(generated),
+                batch_size,
+                cache=self.script_cache,
+                base_url=get_setting(config, 'anthropic_base_url')
+            )
+
+    def _generate_script(self, video_num):
+        with metrics.stage('script', self.labels[video_num]):
+            return self._get_script(video_num)
+
+    def _get_script(self, video_num):
+        if self.replay is not None:
+            script = self.replay[video_num]
+            return script['title'], script['description'], script['prayer']
+        if video_num not in self._batch_index:
+            job = self.jobs[video_num]
+            return job['title'], job['description'], job['prayer']
+        if self.script_batch is not None:
+            return self.script_batch.get(self._batch_index[video_num])
+        return generate_script_from_claude(
+            self.config['anthropic_api_key'],
+            verbose=False,
+            cache=self.script_cache,
+            base_url=get_setting(self.config, 'anthropic_base_url')
+        )
+
+    def _create_voiceover(self, video_num, script_future):
+        title, description, prayer = script_future.result()
+        wall_start = time.perf_counter()
+        audio_path = self._get_voiceover(title, prayer, self.jobs[video_num].get('voice') if self.jobs else None)
+        metrics.add('tts', self.labels[video_num], time.perf_counter() - wall_start,
+                    bytes_written=os.path.getsize(audio_path))
+        return PreparedVideo(video_num, title, description, prayer, audio_path)
+
+    def _get_voiceover(self, title, prayer, voice_id=None):
+        if self.replay is not None:
+            audio_path = get_cached_voiceover(prayer, self.voiceover_cache)
+            if audio_path is None:
+                raise FileNotFoundError(f"The voiceover for '{title}' is no longer in the cache")
+        else:
+            audio_path = create_voiceover(
+                prayer,
+                self.config['elevenlabs_api_key'],
+                cache=self.voiceover_cache,
+                base_url=get_setting(self.config, 'elevenlabs_base_url'),
+                voice_id=voice_id
+            )
+        return audio_path
+
+    def __iter__(self):
+        script_pool = ThreadPoolExecutor(self.script_workers, thread_name_prefix='script')
+        voiceover_pool = ThreadPoolExecutor(self.voiceover_workers, thread_name_prefix='voiceover')
+        pending = deque()
+        next_num = 0
+        try:
+            while next_num < self.num_videos or pending:
+                while next_num < self.num_videos and len(pending) <= self.prefetch:
+                    script_future = script_pool.submit(self._generate_script, next_num)
+                    pending.append((next_num, voiceover_pool.submit(self._create_voiceover, next_num, script_future)))
+                    next_num += 1
+                video_num, future = pending.popleft()
+                if self.on_error is not None and future.exception() is not None:
+                    self.on_error(video_num, future.exception())
+                    continue
+                yield future.result()
+        finally:
+            # Stop queued work and remove audio prepared for videos that will not be rendered
+            script_pool.shutdown(wait=True, cancel_futures=True)
+            voiceover_pool.shutdown(wait=True, cancel_futures=True)
+            for _, future in pending:
+                if future.cancelled() or future.exception() is not None:
+                    continue
+                audio_path = future.result().audio_path
+                if os.path.exists(audio_path):
+                    try:
+                        os.remove(audio_path)
+                    except Exception:
+                        pass
+
+def render_in_parallel(videos, num_videos, render_workers, render_threads, options, config):
+    """Render prepared videos on a RenderScheduler and report the outcome of each job."""
+    with RenderScheduler(render_workers, render_threads,
+                         memory_mb=get_setting(config, 'render_memory_mb')) as scheduler:
+        for video in videos:
+            video_num = video.video_num
+            scheduler.print(f"{Colors.BOLD}Queued video {video_num + 1}/{num_videos}:{Colors.RESET} {video.title}")
+            scheduler.submit(
+                video_num,
+                get_random_background_video(video.audio_path, config),
+                video.audio_path,
+                video.title,
+                video.description,
+                f"output_video_{video_num + 1}.mp4",
+                job=f"video_{video_num + 1}",
+                **options
+            )
+    
+    failed = [result for result in scheduler.results if result.error]
+    for result in sorted(scheduler.results, key=lambda r: r.job_id):
+        if result.error:
+            print(f"\n{Colors.RED}Video {result.job_id + 1}/{num_videos} failed:{Colors.RESET}\n{result.error}")
+        else:
+            print(f"{Colors.GREEN}Video {result.job_id + 1}/{num_videos} saved to {result.output_path}{Colors.RESET}")
+    
+    if failed:
+        print(f"\n{Colors.YELLOW}{num_videos - len(failed)}/{num_videos} videos were generated successfully.{Colors.RESET}")
+    else:
+        print(f"\n{Colors.GREEN}{Colors.BOLD}All {num_videos} videos have been generated successfully!{Colors.RESET}")
+    open_output_dir()
+
+JOB_FIELDS = {'count', 'background', 'title', 'description', 'prayer', 'voice', 'profile', 'preset', 'output'}
+
+# Exit codes of the headless run command
+EXIT_OK = 0
+EXIT_FAILED = 1   # At least one job failed, the others were still rendered
+EXIT_INVALID = 2  # Bad job file or missing setup, nothing was rendered
+
+def validate_job(job, label):
+    """Check the fields of a single job, raising ValueError naming it by label."""
+    if not isinstance(job, dict):
+        raise ValueError(f"{label} is not a JSON object")
+    unknown = set(job) - JOB_FIELDS
+    if unknown:
+        raise ValueError(f"{label} has unknown fields: {', '.join(sorted(unknown))}")
+    if job.get('prayer') and not (job.get('title') and job.get('description')):
+        raise ValueError(f"{label} has a prayer but no title or description")
+    if job.get('preset') and job['preset'] not in X264_PRESETS:
+        raise ValueError(f"{label} has an unknown preset: {job['preset']}")
+    if job.get('background') and not os.path.exists(job['background']):
+        raise ValueError(f"{label} background not found: {job['background']}")
+    count = job.get('count', 1)
+    if not isinstance(count, int) or count < 1:
+        raise ValueError(f"{label} count must be a positive integer")
+
+def load_jobs(job_file, output_prefix='output_video'):
+    """Read a JSON or JSONL job file into a flat list of jobs.
+
+    A .json file holds a list of jobs, or an object with a "jobs" list and optional
+    "defaults" applied to every job. A .jsonl file holds one job per line. A job's
+    "count" repeats it, and each copy gets its own output name.
+    """
+    path = Path(job_file)
+    defaults = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix == '.jsonl':
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            data = json.load(f)
+            if isinstance(data, dict):
+                defaults = data.get('defaults', {})
+                entries = data.get('jobs', [])
+            else:
+                entries = data
+    
+    jobs = []
+    for number, entry in enumerate(entries, 1):
+        if isinstance(entry, dict):
+            entry = {**defaults, **entry}
+        validate_job(entry, f"job {number}")
+        count = entry.pop('count', 1)
+        
+        for copy in range(count):
+            job = dict(entry, index=len(jobs))
+            if not entry.get('output'):
+                job['output'] = f"{output_prefix}_{len(jobs) + 1}.mp4"
+            elif count > 1:
+                output = Path(entry['output'])
+                job['output'] = str(output.with_name(f"{output.stem}_{copy + 1}{output.suffix or '.mp4'}"))
+            jobs.append(job)
+    
+    outputs = [job['output'] for job in jobs]
+    duplicates = sorted({output for output in outputs if outputs.count(output) > 1})
+    if duplicates:
+        raise ValueError(f"several jobs write to {', '.join(duplicates)}")
+    return jobs
+
+def apply_api_key_variables(config):
+    """Let the ANTHROPIC_API_KEY and ELEVENLABS_API_KEY environment variables override config.json."""
+    for key, variable in (('anthropic_api_key', 'ANTHROPIC_API_KEY'), ('elevenlabs_api_key', 'ELEVENLABS_API_KEY')):
+        if os.environ.get(variable):
+            config[key] = os.environ[variable]
+
+def job_label(job):
+    """Name of a job file entry in the run metrics, the same for all of its stages."""
+    return f"job_{job['index'] + 1}"
+
+def read_completed_jobs(progress_path, jobs):
+    """Indexes of the jobs a previous run finished, whose output still exists."""
+    completed = set()
+    if not progress_path.exists():
+        return completed
+    outputs = {job['index']: job['output'] for job in jobs}
+    with open(progress_path, 'r', encoding='utf-8') as f:
+        for line in f:
             try:
-                os.remove(audio_path)
-            except Exception:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # A line cut short when the previous run was killed
+            index = entry.get('index')
+            if outputs.get(index) == entry.get('output') and (Path('output') / entry['output']).exists():
+                completed.add(index)
+    return completed
+
+def run_jobs(job_file, resume=False):
+    """Render every job in a job file without any prompt, returning the exit code.
+
+    Finished jobs are appended to ``<job_file>.progress.jsonl``, so a run that was
+    interrupted can continue with ``resume`` where it stopped.
+    """
+    try:
+        jobs = load_jobs(job_file)
+    except (OSError, ValueError) as e:
+        print(f"{Colors.RED}Invalid job file {job_file}: {e}{Colors.RESET}")
+        return EXIT_INVALID
+    
+    config = load_settings()
+    apply_api_key_variables(config)
+    missing = []
+    if not config.get('elevenlabs_api_key'):
+        missing.append('ElevenLabs API key (ELEVENLABS_API_KEY)')
+    if not config.get('anthropic_api_key') and any(not job.get('prayer') for job in jobs):
+        missing.append('Anthropic API key (ANTHROPIC_API_KEY)')
+    if any(not job.get('background') for job in jobs) and not list(Path('resources/background-videos').glob('*.mp4')):
+        missing.append('background videos in resources/background-videos')
+    if missing:
+        print(f"{Colors.RED}Missing {' and '.join(missing)}{Colors.RESET}")
+        return EXIT_INVALID
+    
+    progress_path = Path(f"{job_file}.progress.jsonl")
+    completed = read_completed_jobs(progress_path, jobs) if resume else set()
+    if not resume and progress_path.exists():
+        progress_path.unlink()
+    pending = [job for job in jobs if job['index'] not in completed]
+    if completed:
+        print(f"{Colors.BLUE}Resuming: {len(completed)}/{len(jobs)} jobs already done.{Colors.RESET}")
+    if not pending:
+        print(f"{Colors.GREEN}Nothing to do, all {len(jobs)} jobs are done.{Colors.RESET}")
+        return EXIT_OK
+    
+    try:
+        options = render_options(config)
+        profiles = {job['index']: get_encode_profile(job['profile'], config) for job in pending if job.get('profile')}
+    except ValueError as e:
+        print(f"{Colors.RED}{e}{Colors.RESET}")
+        return EXIT_INVALID
+    configure_metrics(config)
+    if get_setting(config, 'text_renderer') == 'imagemagick':
+        setup_imagemagick(config)
+    progress_lock = threading.Lock()
+    failed = []
+    
+    def record_finished(job, future):
+        if future.exception() is not None or future.result().error:
+            return
+        with progress_lock, open(progress_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'index': job['index'], 'output': job['output']}) + '\n')
+    
+    render_workers = min(int(get_setting(config, 'render_workers')), len(pending))
+    with RenderScheduler(render_workers, get_render_threads(config),
+                         memory_mb=get_setting(config, 'render_memory_mb')) as scheduler:
+        def skip_failed(video_num, error):
+            job = pending[video_num]
+            failed.append(RenderResult(job['index'], None, f"{type(error).__name__}: {error}", []))
+            scheduler.print(f"{Colors.RED}Job {job['index'] + 1} failed before rendering: {error}{Colors.RESET}")
+        
+        videos = iter(BatchPipeline(config, len(pending), jobs=pending, on_error=skip_failed,
+                                    labels=[job_label(job) for job in pending]))
+        try:
+            for video in videos:
+                job = pending[video.video_num]
+                (Path('output') / job['output']).parent.mkdir(parents=True, exist_ok=True)
+                kwargs = dict(options, job=job_label(job))
+                if job['index'] in profiles:
+                    kwargs['encode_profile'] = profiles[job['index']]
+                if job.get('preset'):
+                    kwargs['preset'] = job['preset']
+                scheduler.print(f"{Colors.BOLD}Queued job {job['index'] + 1}/{len(jobs)}:{Colors.RESET} {video.title}")
+                future = scheduler.submit(
+                    job['index'],
+                    job.get('background') or get_random_background_video(video.audio_path, config),
+                    video.audio_path,
+                    video.title,
+                    video.description,
+                    job['output'],
+                    **kwargs
+                )
+                future.add_done_callback(functools.partial(record_finished, job))
+        finally:
+            videos.close()
+    
+    failed += [result for result in scheduler.results if result.error]
+    for result in sorted(failed, key=lambda r: r.job_id):
+        print(f"\n{Colors.RED}Job {result.job_id + 1} failed:{Colors.RESET}\n{result.error}")
+    report_path = metrics.write_report()
+    if report_path:
+        print(f"{Colors.BLUE}Run report saved to {report_path}{Colors.RESET}")
+    done = len(pending) - len(failed)
+    color = Colors.YELLOW if failed else Colors.GREEN
+    print(f"\n{color}{done}/{len(pending)} jobs rendered to {Path('output').absolute()}.{Colors.RESET}")
+    return EXIT_FAILED if failed else EXIT_OK
+
+class SpoolWorker:
+    """Render jobs dropped into a spool directory, staying up between jobs.
+
+    Each job is a JSON object with the job file fields (see load_jobs). Jobs wait in
+    incoming/, are claimed by moving them to running/<pid>__<name> and end up in done/
+    or failed/ with their result added. Moving a file is atomic and a claim names the
+    worker that owns it, so several workers can share one spool. The render processes, the API clients and the caches in each process stay
+    warm between jobs instead of being set up again for every run.
+    """
+
+    STATES = ('incoming', 'running', 'done', 'failed')
+
+    def __init__(self, spool_dir, config):
+        self.spool_dir = Path(spool_dir)
+        self.config = config
+        self.workers = max(1, int(get_setting(config, 'render_workers')))
+        self.prefetch = max(0, int(get_setting(config, 'prefetch')))
+        self.poll_interval = float(get_setting(config, 'spool_poll_interval'))
+        self.options = render_options(config)
+        self.stop_event = threading.Event()
+        self.started_at = time.time()
+        self.counts = {'done': 0, 'failed': 0}
+        self._lock = threading.Lock()
+        self._active = 0
+        self._next_id = 0
+        for state in self.STATES:
+            (self.spool_dir / state).mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def claim_owner(path):
+        """Split a running/ entry into the PID of the worker that claimed it and the job's file name."""
+        owner, separator, name = path.name.partition('__')
+        if separator and owner.isdigit():
+            return int(owner), name
+        return None, path.name
+
+    @classmethod
+    def job_path(cls, path):
+        """The job's own path, without the owner a claim adds to it."""
+        return path.with_name(cls.claim_owner(path)[1])
+
+    def requeue_interrupted(self):
+        """Move jobs left in running/ by a worker that is no longer alive back to incoming/."""
+        for path in (self.spool_dir / 'running').glob('*.json'):
+            owner, name = self.claim_owner(path)
+            if owner is not None and process_alive(owner):
+                continue
+            try:
+                os.replace(path, self.spool_dir / 'incoming' / name)
+            except OSError:
                 pass
 
-def main():
+    def claim(self):
+        """Take the oldest queued job, returning its path in running/ or None."""
+        for path in sorted((self.spool_dir / 'incoming').glob('*.json')):
+            claimed_path = self.spool_dir / 'running' / f"{os.getpid()}__{path.name}"
+            try:
+                os.rename(path, claimed_path)
+            except OSError:
+                continue  # Another worker got it first
+            return claimed_path
+        return None
+
+    def read_job(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            job = json.load(f)
+        name = self.job_path(path)
+        validate_job(job, name.name)
+        if job.get('count', 1) != 1:
+            raise ValueError(f"{name.name} has a count, queue it with the submit command to expand it")
+        job.setdefault('output', f"{name.stem}.mp4")
+        return job
+
+    def finish(self, path, job, status, **fields):
+        """Record the outcome of a job in done/ or failed/ and free this worker's running/ entry."""
+        result = dict(job, status=status, finished_at=time.strftime('%Y-%m-%dT%H:%M:%S'), **fields)
+        target = self.spool_dir / status / self.job_path(path).name
+        with open(f"{target}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=4, ensure_ascii=False)
+        os.replace(f"{target}.tmp", target)
+        if path.exists():
+            path.unlink()
+        with self._lock:
+            self.counts[status] += 1
+        self.write_status()
+
+    def write_status(self, preparing=0):
+        """Write this worker's state to worker-<pid>.json in the spool."""
+        with self._lock:
+            status = {
+                'pid': os.getpid(),
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+                'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'rendering': self._active,
+                'preparing': preparing,
+                **self.counts,
+            }
+        status_path = self.spool_dir / f"worker-{os.getpid()}.json"
+        with open(f"{status_path}.tmp", 'w') as f:
+            json.dump(status, f, indent=4)
+        os.replace(f"{status_path}.tmp", status_path)
+
+    def _prepare(self, path, job):
+        """Get the script and voiceover of a job, on the prepare threads."""
+        videos = iter(BatchPipeline(self.config, 1, jobs=[job], labels=[self.job_path(path).stem]))
+        try:
+            return next(videos)
+        finally:
+            videos.close()
+
+    def _submit(self, scheduler, path, job, prepared):
+        if prepared.exception() is not None:
+            error = prepared.exception()
+            self.finish(path, job, 'failed', error=f"{type(error).__name__}: {error}")
+            return
+        video = prepared.result()
+        (Path('output') / job['output']).parent.mkdir(parents=True, exist_ok=True)
+        name = self.job_path(path).stem
+        kwargs = dict(self.options, job=name)
+        if job.get('profile'):
+            kwargs['encode_profile'] = get_encode_profile(job['profile'], self.config)
+        if job.get('preset'):
+            kwargs['preset'] = job['preset']
+        with self._lock:
+            self._active += 1
+            job_id = self._next_id
+            self._next_id += 1
+        scheduler.print(f"{Colors.BOLD}Rendering {name}:{Colors.RESET} {video.title}")
+        future = scheduler.submit(
+            job_id,
+            job.get('background') or get_random_background_video(video.audio_path, self.config),
+            video.audio_path,
+            video.title,
+            video.description,
+            job['output'],
+            **kwargs
+        )
+        fields = {'title': video.title, 'description': video.description, 'prayer': video.prayer}
+        future.add_done_callback(functools.partial(self._rendered, path, job, fields, time.time()))
+
+    def _rendered(self, path, job, fields, started, future):
+        try:
+            result = future.result()
+            metrics.extend(result.metrics)
+            error = result.error
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        with self._lock:
+            self._active -= 1
+        fields['seconds'] = round(time.time() - started, 2)
+        if error:
+            self.finish(path, job, 'failed', error=error, **fields)
+        else:
+            self.finish(path, job, 'done', output_path=str(Path(result.output_path).absolute()), **fields)
+
+    def stop(self, *args):
+        if not self.stop_event.is_set():
+            print(f"\n{Colors.YELLOW}Stopping after the jobs in progress...{Colors.RESET}")
+        self.stop_event.set()
+
+    def run(self, once=False):
+        """Process jobs until stopped, or until the queue is empty when once is set."""
+        self.requeue_interrupted()
+        print(f"{Colors.BLUE}Watching {self.spool_dir.absolute() / 'incoming'} "
+              f"with {self.workers} render worker(s)...{Colors.RESET}")
+        self.write_status()
+        voiceover_workers = max(1, int(get_setting(self.config, 'voiceover_workers')))
+        preparing = deque()
+        with RenderScheduler(self.workers, get_render_threads(self.config), keep_results=False,
+                             ignore_interrupts=True, memory_mb=get_setting(self.config, 'render_memory_mb')) as scheduler, \
+                ThreadPoolExecutor(voiceover_workers, thread_name_prefix='prepare') as prepare_pool:
+            while True:
+                # Keep every render worker busy, with up to `prefetch` more jobs prepared ahead
+                queue_empty = False
+                while not self.stop_event.is_set() and len(preparing) + self._active < self.workers + self.prefetch:
+                    path = self.claim()
+                    if path is None:
+                        queue_empty = True
+                        break
+                    try:
+                        job = self.read_job(path)
+                    except (OSError, ValueError) as e:
+                        self.finish(path, {}, 'failed', error=f"Invalid job: {e}")
+                        continue
+                    preparing.append((path, job, prepare_pool.submit(self._prepare, path, job)))
+                    self.write_status(len(preparing))
+                
+                # Hand prepared jobs to free render workers in the order they were queued
+                while preparing and preparing[0][2].done() and self._active < self.workers:
+                    self._submit(scheduler, *preparing.popleft())
+                    self.write_status(len(preparing))
+                
+                idle = not preparing and not self._active
+                if idle and (self.stop_event.is_set() or (once and queue_empty)):
+                    break
+                wait = self.poll_interval if idle else 0.2
+                if self.stop_event.is_set():
+                    time.sleep(wait)
+                else:
+                    self.stop_event.wait(wait)
+        
+        status_path = self.spool_dir / f"worker-{os.getpid()}.json"
+        if status_path.exists():
+            status_path.unlink()
+        report_path = metrics.write_report()
+        if report_path:
+            print(f"{Colors.BLUE}Run report saved to {report_path}{Colors.RESET}")
+        print(f"{Colors.GREEN}{self.counts['done']} jobs done, {self.counts['failed']} failed.{Colors.RESET}")
+        return EXIT_FAILED if self.counts['failed'] else EXIT_OK
+
+def run_worker(spool_dir=None, once=False):
+    """Run a SpoolWorker until Ctrl+C or SIGTERM, returning the exit code."""
+    config = load_settings()
+    apply_api_key_variables(config)
+    spool_dir = spool_dir or get_setting(config, 'spool_dir')
+    try:
+        worker = SpoolWorker(spool_dir, config)
+    except ValueError as e:
+        print(f"{Colors.RED}{e}{Colors.RESET}")
+        return EXIT_INVALID
+    configure_metrics(config)
+    if get_setting(config, 'text_renderer') == 'imagemagick':
+        setup_imagemagick(config)
+    signal.signal(signal.SIGINT, worker.stop)
+    signal.signal(signal.SIGTERM, worker.stop)
+    return worker.run(once=once)
+
+def submit_jobs(job_file, spool_dir=None):
+    """Queue the jobs of a job file in the spool, one file per job, returning the exit code."""
+    config = load_settings()
+    spool_dir = Path(spool_dir or get_setting(config, 'spool_dir'))
+    batch = f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+    try:
+        jobs = load_jobs(job_file, output_prefix=batch)
+    except (OSError, ValueError) as e:
+        print(f"{Colors.RED}Invalid job file {job_file}: {e}{Colors.RESET}")
+        return EXIT_INVALID
+    
+    incoming_dir = spool_dir / 'incoming'
+    incoming_dir.mkdir(parents=True, exist_ok=True)
+    for job in jobs:
+        index = job.pop('index')
+        if job.get('background'):
+            # The worker may run from another directory
+            job['background'] = str(Path(job['background']).absolute())
+        job_path = incoming_dir / f"{batch}_{index + 1:05d}.json"
+        # Write under another name first, so a worker never claims half a job
+        with open(f"{job_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(job, f, indent=4, ensure_ascii=False)
+        os.replace(f"{job_path}.tmp", job_path)
+    print(f"{Colors.GREEN}Queued {len(jobs)} jobs in {incoming_dir}.{Colors.RESET}")
+    return EXIT_OK
+
+def print_spool_status(spool_dir=None):
+    """Print the number of jobs in each state and the running workers."""
+    spool_dir = Path(spool_dir or get_setting(load_settings(), 'spool_dir'))
+    for state in SpoolWorker.STATES:
+        print(f"{Colors.BOLD}{state + ':':<10}{Colors.RESET} {len(list((spool_dir / state).glob('*.json')))}")
+    for status_path in sorted(spool_dir.glob('worker-*.json')):
+        with open(status_path, 'r') as f:
+            status = json.load(f)
+        print(f"Worker {status['pid']}: {status['rendering']} rendering, {status['preparing']} preparing, "
+              f"{status['done']} done, {status['failed']} failed (updated {status['updated_at']})")
+    return EXIT_OK
+
+def main(from_cache=False):
     try:
-        setup_imagemagick()
         setup_background_videos()
         
-        config = setup_api_keys()
+        replay = None
+        max_videos = 10
+        if from_cache:
+            config = load_settings()
+            replay = find_cached_videos(config)
+            if not replay:
+                print(f"{Colors.RED}No cached scripts with voiceovers found, generate some videos first.{Colors.RESET}")
+                sys.exit(1)
+            max_videos = min(max_videos, len(replay))
+            print(f"{Colors.BLUE}Re-rendering from cache, no API calls will be made ({len(replay)} cached).{Colors.RESET}")
+        else:
+            config = setup_api_keys()
+        configure_metrics(config)
+        if get_setting(config, 'text_renderer') == 'imagemagick':
+            setup_imagemagick(config)
         
         while True:
             try:
-                num_videos = input(f"\n{Colors.BOLD}How many videos would you like to generate? (1-10, default: 1):{Colors.RESET} ").strip()
+                num_videos = input(f"\n{Colors.BOLD}How many videos would you like to generate? (1-{max_videos}, default: 1):{Colors.RESET} ").strip()
                 if not num_videos:  # Empty input
                     num_videos = 1
                     break
                 num_videos = int(num_videos)
-                if 1 <= num_videos <= 10:
+                if 1 <= num_videos <= max_videos:
                     break
-                print(f"{Colors.RED}Please enter a number between 1 and 10{Colors.RESET}")
+                print(f"{Colors.RED}Please enter a number between 1 and {max_videos}{Colors.RESET}")
             except ValueError:
                 print(f"{Colors.RED}Please enter a valid number{Colors.RESET}")
         
-        for video_num in range(num_videos):
-            print(f"\n{Colors.BOLD}Generating video {video_num + 1}/{num_videos}...{Colors.RESET}")
-            
-            background_video = get_random_background_video()
-            
-            print(f"\n{Colors.BLUE}Generating script for video {video_num + 1}/{num_videos}...{Colors.RESET}")
-            title, description, script = generate_script_from_claude(config['anthropic_api_key'])
-            
-            print(f"\n{Colors.BLUE}Creating voiceover for video {video_num + 1}/{num_videos}...{Colors.RESET}")
-            audio_path = create_voiceover(script, config['elevenlabs_api_key'])
-            
-            output_path = "output_video.mp4" if num_videos == 1 else f"output_video_{video_num + 1}.mp4"
-            create_final_video(background_video, audio_path, title, description, output_path)
-            
-            print(f"\n{Colors.GREEN}{Colors.BOLD}Video {video_num + 1}/{num_videos} generated successfully!{Colors.RESET}")
+        print(f"\n{Colors.BLUE}Generating scripts and voiceovers...{Colors.RESET}")
+        videos = iter(BatchPipeline(config, num_videos, replay))
+        render_workers = min(int(get_setting(config, 'render_workers')), num_videos)
+        try:
+            if render_workers > 1:
+                render_in_parallel(videos, num_videos, render_workers, get_render_threads(config),
+                                   render_options(config), config)
+                return
+            for video in videos:
+                video_num = video.video_num
+                print(f"\n{Colors.BOLD}Generating video {video_num + 1}/{num_videos}...{Colors.RESET}")
+                print_script(video.title, video.description, video.prayer)
+                
+                background_video = get_random_background_video(video.audio_path, config)
+                
+                output_path = "output_video.mp4" if num_videos == 1 else f"output_video_{video_num + 1}.mp4"
+                create_final_video(background_video, video.audio_path, video.title, video.description, output_path,
+                                   threads=get_render_threads(config), job=f"video_{video_num + 1}",
+                                   **render_options(config))
+                
+                print(f"\n{Colors.GREEN}{Colors.BOLD}Video {video_num + 1}/{num_videos} generated successfully!{Colors.RESET}")
+        finally:
+            videos.close()
+            report_path = metrics.write_report()
+            if report_path:
+                print(f"{Colors.BLUE}Run report saved to {report_path}{Colors.RESET}")
         
         if num_videos > 1:
             print(f"\n{Colors.GREEN}{Colors.BOLD}All {num_videos} videos have been generated successfully!{Colors.RESET}")
         
-        output_dir = Path('output').absolute()
-        os.startfile(output_dir)
+        open_output_dir()
         
     except Exception as e:
-        import traceback
         print(f"\n{Colors.RED}An error occurred:{Colors.RESET}")
         print(f"{Colors.RED}Error type: {type(e).__name__}{Colors.RESET}")
         print(f"{Colors.RED}Error message: {str(e)}{Colors.RESET}")
@@ -530,4 +3110,33 @@ def main():
         print(traceback.format_exc())
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate AutoPrayer videos.")
+    parser.add_argument('command', nargs='?', choices=['warm-cache', 'run', 'worker', 'submit', 'status'],
+                        help="warm-cache: pre-scale all background videos, then exit. "
+                             "run: render the jobs in JOB_FILE without any prompt. "
+                             "worker: render jobs queued in the spool directory until stopped. "
+                             "submit: queue the jobs in JOB_FILE for the workers. "
+                             "status: show the queued, running and finished jobs")
+    parser.add_argument('job_file', nargs='?', help="JSON or JSONL job file for the run and submit commands")
+    parser.add_argument('--from-cache', action='store_true',
+                        help="Re-render cached scripts and voiceovers without calling any API")
+    parser.add_argument('--resume', action='store_true',
+                        help="With run, skip the jobs a previous run of the same job file finished")
+    parser.add_argument('--spool', help="Spool directory of the worker, submit and status commands")
+    parser.add_argument('--once', action='store_true', help="With worker, exit once the queue is empty")
+    args = parser.parse_args()
+    
+    if args.command in ('run', 'submit') and not args.job_file:
+        parser.error(f"the {args.command} command needs a job file")
+    if args.command == 'run':
+        sys.exit(run_jobs(args.job_file, resume=args.resume))
+    elif args.command == 'worker':
+        sys.exit(run_worker(args.spool, once=args.once))
+    elif args.command == 'submit':
+        sys.exit(submit_jobs(args.job_file, args.spool))
+    elif args.command == 'status':
+        sys.exit(print_spool_status(args.spool))
+    elif args.command == 'warm-cache':
+        warm_background_cache()
+    else:
+        main(from_cache=args.from_cache) 
\ No newline at end of file